@@ -2,11 +2,13 @@ import logging
 
 import hashlib
 import jwt
+from time import time
 from typing import Dict, Optional
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from decouple import config, UndefinedValueError
 from app.config import microservice
+from app.utils.ttl_cache import TtlCache
 from pydantic import BaseModel
 
 logging.basicConfig(level=logging.ERROR)
@@ -33,6 +35,13 @@ def api_key_hash(value) -> str:
     return hashlib.md5(f"{value}{JWT_SECRET_SALT}".encode()).hexdigest()
 
 
+# Computed once, every token is checked against this hash.
+API_KEY_HASH = api_key_hash(microservice.api_key)
+
+# Tokens that already passed verification. Keyed by raw token, so only valid tokens are ever stored.
+verified_tokens = TtlCache(maxsize=microservice.auth_cache_size, ttl=microservice.auth_cache_ttl)
+
+
 def sign_jwt(payload: str) -> Dict[str, str]:
     token = jwt.encode({"payload": payload}, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
@@ -52,17 +61,32 @@ class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
+    @staticmethod
+    def _remember(token: str, decoded_value: dict):
+        if verified_tokens.ttl <= 0:
+            return
+        ttl = verified_tokens.ttl
+        if "exp" in decoded_value:
+            # Never keep a token in cache longer than it is valid.
+            ttl = min(ttl, decoded_value["exp"] - time())
+        if ttl > 0:
+            verified_tokens.set(token, True, ttl=ttl)
+
     async def __call__(self, request: Request):
         credentials: HTTPAuthorizationCredentials = await super(JWTBearer, self).__call__(request)
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            decoded_value = decode_jwt(credentials.credentials)
+            token = credentials.credentials
+            if verified_tokens.ttl > 0 and verified_tokens.get(token, False):
+                return token
+            decoded_value = decode_jwt(token)
             if not decoded_value:
                 raise HTTPException(status_code=403, detail="Invalid token.")
             api_key = ApiKeyPayload(**decoded_value)
-            if api_key != microservice.api_key:
+            if api_key.payload != API_KEY_HASH:
                 raise HTTPException(status_code=403, detail="Invalid token.")
-            return credentials.credentials
+            self._remember(token, decoded_value)
+            return token
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
@@ -1,24 +1,131 @@
+import asyncio
 from json import JSONDecodeError
-from typing import Union
+from typing import Union, Optional, List, Tuple
 
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException, Header, Query
 from fastapi.encoders import jsonable_encoder
-from pydantic import ValidationError, BaseModel
-from starlette.responses import JSONResponse
+from pydantic import ValidationError
+from starlette.responses import JSONResponse, Response
 
+from app import config
 from app.api.auth.auth_bearer import JWTBearer
-from tracardi.service.module_loader import import_package, load_callable, is_coroutine
 from tracardi.service.plugin.domain.console import Console
 from tracardi.service.plugin.domain.register import Plugin
 
 from tracardi.service.plugin.service import plugin_context
 
-from app.repo.domain import PluginExecContext, ServiceResource
+from app.repo.domain import PluginExecContext, ServiceResource, PluginBatchItem, PluginJob
+from app.repo.endpoint_registry import EndpointRegistry
+from app.repo.registry_cache import RegistryCache
 from app.repo.services import repo
 from app.utils.converter import convert_errors
+from app.utils.idempotency import IdempotencyStore
+from app.utils.job_queue import JobQueue, JobError
+from app.utils.outbox import Outbox
+from app.utils.plugin_cache import PluginSetUpCache
 
 router = APIRouter()
 
+registry_cache = RegistryCache(repo)
+endpoint_registry = EndpointRegistry()
+
+plugin_cache = PluginSetUpCache(maxsize=config.microservice.plugin_cache_size,
+                                ttl=config.microservice.plugin_cache_ttl)
+
+
+async def _run_plugin(service_id: str, action_id: str, data: PluginExecContext) -> dict:
+    plugin_type = repo.get_plugin(service_id, action_id)
+    if plugin_type:
+        plugin = plugin_type()
+        plugin.console = Console(plugin_type, __name__)
+        # set context
+        data.context['node']['className'] = plugin_type.__name__
+        data.context['node']['module'] = __name__
+
+        plugin_context.set_context(plugin, data.context, include=['node'])
+
+        await plugin_cache.set_up(plugin, data.init, data.context['node'])
+        result = await plugin.run(**data.params)
+        return {
+            "result": result,
+            "context": plugin_context.get_context(plugin, include=['node']),
+            "console": plugin.console.dict()
+        }
+    return {}
+
+
+async def _run_job(service_id: str, action_id: str, data: PluginExecContext) -> dict:
+    response = await _run_plugin(service_id, action_id, data)
+    # Nobody reads the ports of a background job, so an error port fails the job and lets it be retried.
+    result = response.get("result", None)
+    if result is not None and getattr(result, "port", None) == "error":
+        value = result.value if isinstance(result.value, dict) else {}
+        raise JobError(value.get("message", "Plugin returned error."))
+    return response
+
+
+def _is_replayable(response: Tuple[int, dict]) -> bool:
+    status_code, content = response
+    if status_code >= 400:
+        return False
+    # Plugin errors come back with 200 on the error port. They are not stored, so a retry runs the plugin again.
+    result = content.get("result", None) if isinstance(content, dict) else None
+    return not (isinstance(result, dict) and result.get("port", None) == "error")
+
+
+def _is_durable(service_id: str, action_id: str) -> bool:
+    plugin_type = repo.get_plugin(service_id, action_id)
+    return getattr(plugin_type, "durable", False)
+
+
+outbox = Outbox(path=config.microservice.outbox_path,
+                commit_interval=config.microservice.outbox_commit_interval,
+                max_attempts=config.microservice.outbox_max_attempts,
+                backoff=config.microservice.outbox_backoff,
+                max_backoff=config.microservice.outbox_max_backoff) if config.microservice.outbox_path else None
+
+idempotency_store = IdempotencyStore(maxsize=config.microservice.idempotency_cache_size,
+                                     ttl=config.microservice.idempotency_ttl)
+
+job_queue = JobQueue(_run_job,
+                     workers=config.microservice.job_workers,
+                     maxsize=config.microservice.job_queue_size,
+                     ttl=config.microservice.job_ttl,
+                     outbox=outbox,
+                     durable=_is_durable)
+
+
+# Must be registered before /plugin/{module}/{endpoint_function}, otherwise that route would catch it.
+@router.post("/plugin/run/batch", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
+async def run_plugin_batch(items: List[PluginBatchItem], concurrency: Optional[int] = None):
+
+    """
+    Runs many plugins concurrently. Results are returned in the order of the items. An error in one
+    item is reported in its result and does not fail the whole batch.
+    :param items: List[PluginBatchItem]
+    :param concurrency: Max number of plugins running at the same time.
+    :return: dict
+    """
+
+    semaphore = asyncio.Semaphore(max(1, concurrency or config.microservice.batch_concurrency))
+
+    async def _run_item(item):
+        async with semaphore:
+            try:
+                response = await _run_plugin(item.service_id, item.action_id, item.data)
+                return {"status": 200, **response}
+            except ValidationError as e:
+                return {"status": 422, "detail": jsonable_encoder(convert_errors(e))}
+            except Exception as e:
+                return {"status": 500, "detail": str(e)}
+
+    results = await asyncio.gather(*[_run_item(item) for item in items])
+
+    return {
+        "total": len(results),
+        "result": results
+    }
+
 
 @router.post("/plugin/{module}/{endpoint_function}", dependencies=[Depends(JWTBearer())], tags=["microservice"],
              response_model=dict)
@@ -27,20 +134,18 @@ async def get_data_for_plugin(module: str, endpoint_function: str, request: Requ
     Calls helper method from Endpoint class in plugin's module
     """
 
-    try:
-        if not module.startswith('app.services'):
-            raise HTTPException(status_code=404, detail="This is not helper endpoint.")
-
-        module = import_package(module)
-        endpoint_module = load_callable(module, 'Endpoint')
-        function_to_call = getattr(endpoint_module, endpoint_function)
+    endpoint = endpoint_registry.get(module, endpoint_function)
+    if endpoint is None:
+        raise HTTPException(status_code=404, detail="This is not helper endpoint.")
+    function_to_call, is_async = endpoint
 
+    try:
         try:
             body = await request.json()
         except JSONDecodeError:
             body = {}
 
-        if is_coroutine(function_to_call):
+        if is_async:
             return await function_to_call(body)
         return function_to_call(body)
 
@@ -49,41 +154,43 @@ async def get_data_for_plugin(module: str, endpoint_function: str, request: Requ
             status_code=422,
             content=jsonable_encoder(convert_errors(e))
         )
-    except AttributeError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/manifest", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
+async def get_manifest(request: Request, manifest_hash: Optional[str] = Query(None, alias="hash")):
+
+    """
+    Returns all services with their actions, forms, init values, registry specs and resource forms
+    in one document. Pass the hash of the document you have (or If-None-Match) to get 304 if
+    nothing changed.
+    :param manifest_hash: Optional[str], sent as hash
+    :return: dict
+    """
+
+    if manifest_hash is not None and manifest_hash == registry_cache.manifest_hash:
+        return Response(status_code=304, headers={"ETag": registry_cache.manifest.etag_for(request),
+                                                  "Vary": "Accept-Encoding"})
+    return registry_cache.manifest.response(request)
 
 
 @router.get("/services", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
-async def get_all_services():
-    services = list(repo.get_all_services())
-    return {
-        "total": len(services),
-        "result": {id: name for id, name in services}
-    }
+async def get_all_services(request: Request):
+    return registry_cache.services.response(request)
 
 
 @router.get("/actions", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
-async def get_actions(service_id: str):
-    actions = list(repo.get_all_action_plugins(service_id))
-    return {
-        "total": len(actions),
-        "result": {id: name for id, name in actions}
-    }
+async def get_actions(service_id: str, request: Request):
+    return registry_cache.get_actions(service_id).response(request)
 
 
 @router.get("/plugin/form", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
-async def get_plugin_form(service_id: str, action_id: str):
-    init, form = repo.get_plugin_form_an_init(service_id, action_id)
-
-    return {
-        "init": init if init is not None else {},
-        "form": form.dict() if form is not None else None
-    }
+async def get_plugin_form(service_id: str, action_id: str, request: Request):
+    return registry_cache.get_form(service_id, action_id).response(request)
 
 
 @router.get("/service/resource", dependencies=[Depends(JWTBearer())], tags=["microservice"],
             response_model=Union[dict, None])
-async def get_service_resource(service_id: str):
+async def get_service_resource(service_id: str, request: Request):
 
     """
     Returns service resource definition.
@@ -91,10 +198,7 @@ async def get_service_resource(service_id: str):
     :return: Union[dict, None]
     """
 
-    service = repo.get_service(service_id)
-    if service is not None and isinstance(service.resource, BaseModel):
-        return service.resource.dict(exclude={"validator": ...})
-    return None
+    return registry_cache.get_resource(service_id).response(request)
 
 
 @router.post("/service/resource/validate", dependencies=[Depends(JWTBearer())], tags=["microservice"])
@@ -126,7 +230,7 @@ async def validate_resource(service_id: str, resource: dict):
 
 @router.get("/plugin/registry", dependencies=[Depends(JWTBearer())], tags=["microservice"],
             response_model=Union[Plugin, None])
-async def get_plugin_registry(service_id: str):
+async def get_plugin_registry(service_id: str, request: Request):
 
     """
     Returns plugin specification
@@ -135,7 +239,7 @@ async def get_plugin_registry(service_id: str):
     :return: Union[Plugin, None]
     """
 
-    return repo.get_plugin_registry(service_id)
+    return registry_cache.get_registry(service_id).response(request)
 
 
 @router.post("/plugin/validate", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
@@ -151,37 +255,63 @@ async def validate_plugin_configuration(service_id: str, action_id: str, config:
 
 
 @router.post("/plugin/run", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
-async def run_plugin(service_id: str, action_id: str, data: PluginExecContext):
+async def run_plugin(service_id: str, action_id: str, data: PluginExecContext, asynchronous: bool = False,
+                     idempotency_key: Optional[str] = None,
+                     idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")):
 
     """
-    Runs the plugin.
+    Runs the plugin. If asynchronous is set the plugin is queued and 202 with the job id is returned
+    right away. The outcome can be read from /job/{job_id}.
+
+    If an idempotency key is sent (Idempotency-Key header or idempotency_key query parameter), e.g. event id
+    and node id, the response is stored and a retry with the same key returns it without running the plugin
+    again. Errors, including results on the error port, are not stored.
     :param service_id:
     :param action_id:
     :param data:
+    :param asynchronous:
+    :param idempotency_key:
+    :param idempotency_key_header:
     :return:
     """
 
-    try:
-        plugin_type = repo.get_plugin(service_id, action_id)
-        if plugin_type:
-            plugin = plugin_type()
-            plugin.console = Console(plugin_type, __name__)
-            # set context
-            data.context['node']['className'] = plugin_type.__name__
-            data.context['node']['module'] = __name__
-
-            plugin_context.set_context(plugin, data.context, include=['node'])
-
-            await plugin.set_up(data.init)
-            result = await plugin.run(**data.params)
-            return {
-                "result": result,
-                "context": plugin_context.get_context(plugin, include=['node']),
-                "console": plugin.console.dict()
-            }
-        return {}
-    except ValidationError as e:
-        return JSONResponse(
-            status_code=422,
-            content=jsonable_encoder(convert_errors(e))
-        )
+    async def _run():
+        if asynchronous:
+            try:
+                job = await job_queue.submit(service_id, action_id, data)
+            except asyncio.QueueFull:
+                raise HTTPException(status_code=503, detail="Job queue is full.")
+            return 202, {"job_id": job.id, "status": job.status}
+
+        try:
+            return 200, jsonable_encoder(await _run_plugin(service_id, action_id, data))
+        except ValidationError as e:
+            return 422, jsonable_encoder(convert_errors(e))
+
+    key = idempotency_key_header or idempotency_key
+    if key is None:
+        status_code, content = await _run()
+        return JSONResponse(status_code=status_code, content=content)
+
+    (status_code, content), replayed = await idempotency_store.run(
+        (service_id, action_id, asynchronous, key),
+        _run,
+        cacheable=_is_replayable
+    )
+    return JSONResponse(status_code=status_code, content=content,
+                        headers={"Idempotent-Replayed": "true" if replayed else "false"})
+
+
+@router.get("/job/{job_id}", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=PluginJob)
+async def get_job(job_id: str):
+
+    """
+    Returns status of the plugin started with /plugin/run?asynchronous=true
+    :param job_id:
+    :return: PluginJob
+    """
+
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
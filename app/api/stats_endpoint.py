@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+
+from app.api.auth.auth_bearer import JWTBearer
+from app.api import service_endpoint
+from app.services.trello.batcher import trello_batcher
+from app.services.trello.circuit_breaker import trello_circuit_breaker
+from app.services.trello.rate_limiter import trello_rate_limiter
+from app.services.trello.session_pool import trello_session_pool
+from app.services.trello.trello_cache import trello_cache
+from app.services.trello.trello_client import trello_flight
+from app.services.trello.webhook import webhook_stats
+
+router = APIRouter()
+
+
+@router.get("/stats", dependencies=[Depends(JWTBearer())], tags=["microservice"], response_model=dict)
+async def get_stats():
+
+    """
+    Returns counters of the microservice caches.
+    :return: dict
+    """
+
+    return {
+        "plugin_cache": service_endpoint.plugin_cache.stats(),
+        "endpoint_cache": service_endpoint.endpoint_registry.stats(),
+        "jobs": service_endpoint.job_queue.stats(),
+        "idempotency": service_endpoint.idempotency_store.stats(),
+        "outbox": await service_endpoint.outbox.stats() if service_endpoint.outbox else {"enabled": False},
+        "trello": {
+            "pool": trello_session_pool.stats(),
+            "index": trello_cache.stats(),
+            "rate_limit": trello_rate_limiter.stats(),
+            "circuit_breaker": trello_circuit_breaker.stats(),
+            "batch": trello_batcher.stats(),
+            "singleflight": trello_flight.stats(),
+            "webhook": dict(webhook_stats)
+        }
+    }
@@ -0,0 +1,127 @@
+import json
+from json import JSONDecodeError
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response, StreamingResponse
+
+from app import config
+from app.api.auth.auth_bearer import JWTBearer
+from app.services.trello.bulk import TrelloBulk, TrelloBulkRequest, OPERATIONS
+from app.services.trello.trello_client import TrelloClient
+from app.services.trello.webhook import verify_signature, apply_action, webhook_stats, \
+    TrelloWebhookRegistration, TrelloWebhookRemoval
+
+router = APIRouter()
+
+
+@router.post("/trello/bulk/{operation}", dependencies=[Depends(JWTBearer())], tags=["trello"])
+async def trello_bulk(operation: str, request: TrelloBulkRequest):
+
+    """
+    Runs add_card, move_card, delete_card or add_member for many items, e.g. a whole segment.
+    Items are card objects for add_card, {"card_name"} for move_card and delete_card and
+    {"card_name", "member_id"} for add_member. Results are streamed as new line delimited JSON
+    in the order they complete, each with the index of its item.
+    :param operation: add_card | move_card | delete_card | add_member
+    :param request: TrelloBulkRequest
+    :return: StreamingResponse
+    """
+
+    if operation not in OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown bulk operation. Use one of {', '.join(OPERATIONS)}.")
+
+    bulk = TrelloBulk(operation, request, concurrency=config.microservice.batch_concurrency)
+    try:
+        await bulk.resolve()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def _stream():
+        async for result in bulk.run():
+            yield json.dumps(jsonable_encoder(result)) + "\n"
+
+    # GZipMiddleware would hold the lines in its buffer until the stream ends. A response that already has
+    # a Content-Encoding is passed through, so every line reaches the client as soon as its item is done.
+    return StreamingResponse(_stream(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity"})
+
+
+@router.head("/trello/webhook", tags=["trello"])
+async def trello_webhook_check():
+
+    """
+    Trello sends HEAD to the callback when the webhook is registered and expects 200.
+    """
+
+    return Response(status_code=200)
+
+
+@router.post("/trello/webhook", tags=["trello"])
+async def trello_webhook(request: Request):
+
+    """
+    Receives Trello actions and updates the card and list indexes of all credentials. Requests must be
+    signed with TRELLO_WEBHOOK_SECRET, there is no JWT as Trello can not send it.
+    :param request:
+    :return: dict
+    """
+
+    body = await request.body()
+    callback_url = config.microservice.trello_webhook_callback_url or str(request.url)
+    if not verify_signature(body, callback_url, config.microservice.trello_webhook_secret,
+                            request.headers.get("X-Trello-Webhook", None)):
+        webhook_stats["rejected"] += 1
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+
+    try:
+        action = json.loads(body).get("action", None) or {}
+    except (JSONDecodeError, AttributeError):
+        raise HTTPException(status_code=422, detail="Invalid webhook body.")
+
+    webhook_stats["received"] += 1
+    applied = apply_action(action)
+    if applied:
+        webhook_stats["applied"] += 1
+    return {"applied": applied}
+
+
+@router.post("/trello/webhook/register", dependencies=[Depends(JWTBearer())], tags=["trello"])
+async def trello_webhook_register(registration: TrelloWebhookRegistration):
+
+    """
+    Registers TRELLO_WEBHOOK_CALLBACK_URL as the webhook of the board, so the caches of the board are kept
+    fresh when cards are changed in Trello.
+    :param registration: TrelloWebhookRegistration
+    :return: dict
+    """
+
+    callback_url = config.microservice.trello_webhook_callback_url
+    if not callback_url or not config.microservice.trello_webhook_secret:
+        raise HTTPException(status_code=400, detail="TRELLO_WEBHOOK_CALLBACK_URL and TRELLO_WEBHOOK_SECRET "
+                                                    "must be set to register webhooks.")
+
+    client = TrelloClient(registration.credentials.api_key, registration.credentials.token)
+    try:
+        return await client.register_webhook(registration.board_url, callback_url, registration.description)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+@router.post("/trello/webhook/delete", dependencies=[Depends(JWTBearer())], tags=["trello"])
+async def trello_webhook_delete(removal: TrelloWebhookRemoval):
+
+    """
+    Deletes the webhook.
+    :param removal: TrelloWebhookRemoval
+    :return: dict
+    """
+
+    client = TrelloClient(removal.credentials.api_key, removal.credentials.token)
+    try:
+        return await client.delete_webhook(removal.webhook_id)
+    except ConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
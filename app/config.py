@@ -17,5 +17,40 @@ class MicroserviceConfig:
             logger.error(f"API_KEY environment variable not defined. {str(e)}")
             exit(1)
 
+        self.auth_cache_ttl = config('AUTH_CACHE_TTL', default=300, cast=int)
+        self.auth_cache_size = config('AUTH_CACHE_SIZE', default=1024, cast=int)
+        self.batch_concurrency = config('BATCH_CONCURRENCY', default=10, cast=int)
+        self.plugin_cache_size = config('PLUGIN_CACHE_SIZE', default=512, cast=int)
+        self.plugin_cache_ttl = config('PLUGIN_CACHE_TTL', default=3600, cast=int)
+        self.job_workers = config('JOB_WORKERS', default=10, cast=int)
+        self.job_queue_size = config('JOB_QUEUE_SIZE', default=10000, cast=int)
+        self.job_ttl = config('JOB_TTL', default=3600, cast=int)
+        self.idempotency_cache_size = config('IDEMPOTENCY_CACHE_SIZE', default=10000, cast=int)
+        self.idempotency_ttl = config('IDEMPOTENCY_TTL', default=86400, cast=int)
+        self.outbox_path = config('OUTBOX_PATH', default='outbox.db')
+        self.outbox_commit_interval = config('OUTBOX_COMMIT_INTERVAL', default=0.01, cast=float)
+        self.outbox_max_attempts = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+        self.outbox_backoff = config('OUTBOX_BACKOFF', default=1, cast=float)
+        self.outbox_max_backoff = config('OUTBOX_MAX_BACKOFF', default=300, cast=float)
+        self.trello_api_url = config('TRELLO_API_URL', default='https://api.trello.com/1')
+        self.trello_pool_size = config('TRELLO_POOL_SIZE', default=100, cast=int)
+        self.trello_pool_size_per_host = config('TRELLO_POOL_SIZE_PER_HOST', default=50, cast=int)
+        self.trello_keepalive_timeout = config('TRELLO_KEEPALIVE_TIMEOUT', default=30, cast=float)
+        self.trello_dns_ttl = config('TRELLO_DNS_TTL', default=300, cast=int)
+        self.trello_timeout = config('TRELLO_TIMEOUT', default=30, cast=float)
+        self.trello_cache_size = config('TRELLO_CACHE_SIZE', default=10000, cast=int)
+        self.trello_cache_ttl = config('TRELLO_CACHE_TTL', default=300, cast=int)
+        self.trello_cache_negative_ttl = config('TRELLO_CACHE_NEGATIVE_TTL', default=30, cast=int)
+        self.trello_rate_limit = config('TRELLO_RATE_LIMIT', default=8, cast=float)
+        self.trello_rate_burst = config('TRELLO_RATE_BURST', default=20, cast=float)
+        self.trello_rate_max_retries = config('TRELLO_RATE_MAX_RETRIES', default=5, cast=int)
+        self.trello_retry_backoff = config('TRELLO_RETRY_BACKOFF', default=0.1, cast=float)
+        self.trello_retry_max_backoff = config('TRELLO_RETRY_MAX_BACKOFF', default=5, cast=float)
+        self.trello_breaker_threshold = config('TRELLO_BREAKER_THRESHOLD', default=5, cast=int)
+        self.trello_breaker_reset_timeout = config('TRELLO_BREAKER_RESET_TIMEOUT', default=30, cast=float)
+        self.trello_webhook_secret = config('TRELLO_WEBHOOK_SECRET', default='')
+        self.trello_webhook_callback_url = config('TRELLO_WEBHOOK_CALLBACK_URL', default='')
+        self.trello_batch_window = config('TRELLO_BATCH_WINDOW', default=0.005, cast=float)
+
 
 microservice = MicroserviceConfig(os.environ)
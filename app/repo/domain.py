@@ -10,6 +10,26 @@ class PluginExecContext(BaseModel):
     init: dict
 
 
+class PluginBatchItem(BaseModel):
+    service_id: str
+    action_id: str
+    data: PluginExecContext
+
+
+class PluginJob(BaseModel):
+    id: str
+    service_id: str
+    action_id: str
+    status: str
+    created: float
+    attempts: int = 0
+    durable: bool = False
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    response: Optional[dict] = None
+    error: Optional[str] = None
+
+
 class PluginConfig(BaseModel):
     name: str
     validator: Callable
@@ -0,0 +1,53 @@
+from typing import Callable, Dict, Optional, Tuple, Type, List
+
+from tracardi.service.module_loader import is_coroutine
+from tracardi.service.plugin.plugin_endpoint import PluginEndpoint
+
+from app.utils.endpoint_cache import CachedEndpoint, CACHE_ATTRIBUTE
+
+
+def _subclasses(cls: Type) -> List[Type]:
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result += _subclasses(subclass)
+    return result
+
+
+class EndpointRegistry:
+    """
+    Public methods of all PluginEndpoint subclasses from app.services, keyed by (module, function).
+    Built once at startup, so a request is resolved with one dict lookup and without touching the
+    import machinery. Methods marked with @cache_response are wrapped in a response cache.
+    """
+
+    def __init__(self, package: str = 'app.services'):
+        self._endpoints: Dict[Tuple[str, str], Tuple[Callable, bool]] = {}
+        self._cached: Dict[Tuple[str, str], CachedEndpoint] = {}
+
+        for endpoint in _subclasses(PluginEndpoint):
+            module_name = endpoint.__module__
+            if not module_name.startswith(package):
+                continue
+            for name in dir(endpoint):
+                if name.startswith('_') or hasattr(PluginEndpoint, name):
+                    continue
+                function = getattr(endpoint, name)
+                if not callable(function):
+                    continue
+                cache_spec = getattr(function, CACHE_ATTRIBUTE, None)
+                if cache_spec is not None:
+                    cached = CachedEndpoint(function, is_coroutine(function), **cache_spec)
+                    self._cached[(module_name, name)] = cached
+                    self._endpoints[(module_name, name)] = (cached, True)
+                else:
+                    self._endpoints[(module_name, name)] = (function, is_coroutine(function))
+
+    def get(self, module: str, function_name: str) -> Optional[Tuple[Callable, bool]]:
+        return self._endpoints.get((module, function_name), None)
+
+    def stats(self) -> dict:
+        return {f"{module}.{name}": endpoint.stats() for (module, name), endpoint in self._cached.items()}
+
+    def __len__(self):
+        return len(self._endpoints)
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.repo.domain import ServicesRepo
+
+MANIFEST_VERSION = 1
+# Same threshold as GZipMiddleware in app.server.
+GZIP_MINIMUM_SIZE = 1024
+
+
+def serialize(value: Any) -> bytes:
+    # Same output as starlette JSONResponse.
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedResponse:
+    """
+    JSON response serialized once, served with a strong ETag. Larger responses are also gzipped once.
+    The gzipped representation has its own ETag, strong validators must differ between content codings,
+    and GZipMiddleware leaves responses that already have Content-Encoding alone.
+    """
+
+    __slots__ = ("content", "etag", "gzipped", "gzip_etag")
+
+    def __init__(self, value: Any = None, content: Optional[bytes] = None, etag: Optional[str] = None):
+        self.content = serialize(value) if content is None else content
+        etag = etag or hashlib.sha1(self.content).hexdigest()
+        self.etag = f'"{etag}"'
+        if len(self.content) >= GZIP_MINIMUM_SIZE:
+            self.gzipped = gzip.compress(self.content)
+            self.gzip_etag = f'"{etag}-gzip"'
+        else:
+            self.gzipped = None
+            self.gzip_etag = None
+
+    def accepts_gzip(self, request: Request) -> bool:
+        return self.gzipped is not None and "gzip" in request.headers.get("accept-encoding", "")
+
+    def etag_for(self, request: Request) -> str:
+        return self.gzip_etag if self.accepts_gzip(request) else self.etag
+
+    @staticmethod
+    def not_modified(request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match", None)
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    def response(self, request: Request) -> Response:
+        compressed = self.accepts_gzip(request)
+        headers = {"ETag": self.gzip_etag if compressed else self.etag, "Vary": "Accept-Encoding"}
+        if self.not_modified(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if compressed:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=self.gzipped, media_type="application/json", headers=headers)
+        return Response(content=self.content, media_type="application/json", headers=headers)
+
+
+class RegistryCache:
+    """
+    Serialized answers of all registry endpoints. The services repo does not change while the
+    process runs, so everything is built once.
+    """
+
+    def __init__(self, repo: ServicesRepo):
+        self.none = CachedResponse(None)
+
+        services = list(repo.get_all_services())
+        self.services = CachedResponse({
+            "total": len(services),
+            "result": {id: name for id, name in services}
+        })
+
+        self.empty_actions = CachedResponse({"total": 0, "result": {}})
+        self.empty_form = CachedResponse({"init": {}, "form": None})
+
+        manifest = {}
+
+        self.actions: Dict[str, CachedResponse] = {}
+        self.forms: Dict[Tuple[str, str], CachedResponse] = {}
+        self.registries: Dict[str, CachedResponse] = {}
+        self.resources: Dict[str, CachedResponse] = {}
+
+        for service_id, _ in services:
+            actions = list(repo.get_all_action_plugins(service_id))
+            self.actions[service_id] = CachedResponse({
+                "total": len(actions),
+                "result": {id: name for id, name in actions}
+            })
+
+            manifest_actions = {}
+            for action_id, action_name in actions:
+                init, form = repo.get_plugin_form_an_init(service_id, action_id)
+                plugin_form = {
+                    "init": init if init is not None else {},
+                    "form": form.dict() if form is not None else None
+                }
+                self.forms[(service_id, action_id)] = CachedResponse(plugin_form)
+                manifest_actions[action_id] = {"name": action_name, **plugin_form}
+
+            registry = repo.get_plugin_registry(service_id)
+            self.registries[service_id] = CachedResponse(registry)
+
+            service = repo.get_service(service_id)
+            resource = None
+            if service is not None and isinstance(service.resource, BaseModel):
+                resource = service.resource.dict(exclude={"validator": ...})
+                self.resources[service_id] = CachedResponse(resource)
+
+            manifest[service_id] = {
+                "name": service.name if service is not None else None,
+                "registry": registry,
+                "resource": resource,
+                "actions": manifest_actions
+            }
+
+        # The hash covers the content only, so it changes only when the services change.
+        self.manifest_hash = hashlib.sha1(serialize(manifest)).hexdigest()
+        self.manifest = CachedResponse({
+            "version": MANIFEST_VERSION,
+            "hash": self.manifest_hash,
+            "services": manifest
+        }, etag=self.manifest_hash)
+
+    def get_actions(self, service_id: str) -> CachedResponse:
+        return self.actions.get(service_id, self.empty_actions)
+
+    def get_form(self, service_id: str, action_id: str) -> CachedResponse:
+        return self.forms.get((service_id, action_id), self.empty_form)
+
+    def get_registry(self, service_id: str) -> CachedResponse:
+        return self.registries.get(service_id, self.none)
+
+    def get_resource(self, service_id: str) -> CachedResponse:
+        return self.resources.get(service_id, self.none)
@@ -2,11 +2,14 @@ import logging
 import os
 from time import time
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi import FastAPI, Request
 from starlette.responses import JSONResponse
 from starlette.staticfiles import StaticFiles
 from app import config
-from app.api import service_endpoint, auth_endpoint
+from app.api import service_endpoint, auth_endpoint, stats_endpoint, trello_endpoint
+from app.repo.registry_cache import GZIP_MINIMUM_SIZE
+from app.services.trello.session_pool import trello_session_pool
 from tracardi.config import tracardi
 
 logging.basicConfig(level=logging.ERROR)
@@ -45,8 +48,23 @@ application.add_middleware(
     allow_headers=["*"],
 )
 
+application.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 application.include_router(service_endpoint.router)
 application.include_router(auth_endpoint.router)
+application.include_router(stats_endpoint.router)
+application.include_router(trello_endpoint.router)
+
+
+@application.on_event("startup")
+async def app_startup():
+    await service_endpoint.job_queue.start()
+
+
+@application.on_event("shutdown")
+async def app_shutdown():
+    await service_endpoint.job_queue.stop()
+    await trello_session_pool.close()
 
 
 @application.middleware("http")
@@ -4,8 +4,9 @@ from app.services.trello.trello_client import TrelloClient
 from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Documentation, PortDoc, Form, FormGroup, \
     FormField, FormComponent
 from tracardi.service.plugin.domain.result import Result
-from tracardi.service.notation.dict_traverser import DictTraverser
-from tracardi.service.notation.dot_template import DotTemplate
+from app.utils.dot_template import render_template
+from app.utils.endpoint_cache import cache_response
+from app.utils.reshape import compile_reshape, ReshapePlan
 
 from app.services.trello.add_card.config import Config, Card
 from app.services.trello.credentials import TrelloCredentials
@@ -15,6 +16,7 @@ from tracardi.service.plugin.plugin_endpoint import PluginEndpoint
 
 class Endpoint(PluginEndpoint):
     @staticmethod
+    @cache_response(ttl=30)
     async def test(config: dict):
         print(config)
         return {"result": [
@@ -36,9 +38,11 @@ async def validate(config: dict, credentials: Optional[dict]) -> Config:
 
 class TrelloCardAdder(TrelloPlugin):
     config: Config
+    _card_plan: ReshapePlan
 
     async def set_up(self, init):
         self.config = Config(**init)
+        self._card_plan = compile_reshape(self.config.card.dict())
         self.set_up_trello(self.node)
 
     async def run(self, payload: dict, in_edge=None) -> Result:
@@ -50,11 +54,9 @@ class TrelloCardAdder(TrelloPlugin):
             coords = f"{coords['latitude']}," \
                      f"{coords['longitude']}" if isinstance(coords, dict) else coords
 
-            traverser = DictTraverser(dot)
-            card = Card(**traverser.reshape(self.config.card.dict()))
+            card = Card(**self._card_plan.run(dot))
 
-            template = DotTemplate()
-            card.desc = template.render(self.config.card.desc, dot)
+            card.desc = render_template(self.config.card.desc, dot)
             card.due = str(dot[self.config.card.due]) if self.config.card.due is not None else None
             card.coordinates = coords
 
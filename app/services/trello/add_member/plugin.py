@@ -27,10 +27,12 @@ class TrelloMemberAdder(TrelloPlugin):
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         dot = self._get_dot_accessor(payload)
-        member_id = dot[self.config.member_id]
+        member = dot[self.config.member_id]
         card_name = dot[self.config.card_name]
 
         try:
+            # Member may be given by id, username or email.
+            member_id = await self._client.get_member_id(self.config.board_url, str(member))
             result = await self._client.add_member(self.config.list_id, card_name, member_id)
         except (ConnectionError, ValueError) as e:
             self.console.error(str(e))
@@ -84,11 +86,11 @@ def register() -> Plugin:
                             ),
                             FormField(
                                 id="member_id",
-                                name="ID of the member",
-                                description="Please provide the path to the field containing ID of the member that you "
-                                            "want to add.",
+                                name="Member",
+                                description="Please provide the path to the field containing ID, username or email "
+                                            "of the member that you want to add.",
                                 component=FormComponent(type="dotPath",
-                                                        props={"label": "ID of the member", "defaultMode": "2"})
+                                                        props={"label": "Member", "defaultMode": "2"})
                             )
                         ]
                     )
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.config import microservice
+from app.services.trello.errors import TrelloResponseError
+
+# Trello accepts up to 10 routes in one /batch call.
+MAX_BATCH_SIZE = 10
+
+
+class _Batch:
+
+    def __init__(self, client):
+        self.client = client
+        self.items: List[Tuple[str, Optional[dict], asyncio.Future]] = []
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class TrelloBatcher:
+    """
+    Collects GET requests that arrive within a short window for the same credentials and sends them
+    as one Trello /batch call. Every caller gets its own result or error.
+    """
+
+    def __init__(self, window: float, max_size: int = MAX_BATCH_SIZE):
+        self.window = window
+        self.max_size = max_size
+        self._batches: Dict[str, _Batch] = {}
+        self.batches = 0
+        self.requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def get(self, client, path: str, params: Optional[dict] = None) -> Any:
+        future = asyncio.get_running_loop().create_future()
+
+        batch = self._batches.get(client.credentials, None)
+        if batch is None:
+            batch = self._batches[client.credentials] = _Batch(client)
+            batch.handle = asyncio.get_running_loop().call_later(
+                self.window, lambda: asyncio.ensure_future(self._flush(client.credentials, batch)))
+        batch.items.append((path, params, future))
+
+        if len(batch.items) >= self.max_size:
+            # Full batch goes out now, the next request starts a new one.
+            batch.handle.cancel()
+            del self._batches[client.credentials]
+            asyncio.ensure_future(self._flush(client.credentials, batch))
+
+        return await future
+
+    async def _flush(self, credentials: str, batch: _Batch) -> None:
+        if self._batches.get(credentials, None) is batch:
+            del self._batches[credentials]
+
+        items = [item for item in batch.items if not item[2].done()]
+        if not items:
+            return
+
+        self.requests += len(items)
+        try:
+            if len(items) == 1:
+                path, params, _ = items[0]
+                results = [{"200": await batch.client._send("GET", path, params)}]
+            else:
+                self.batches += 1
+                results = await batch.client._send("GET", "/batch", params={
+                    # Commas separate the routes. urlencode escapes commas inside query values.
+                    "urls": ",".join(self._route(path, params) for path, params, _ in items)
+                })
+        except Exception as e:
+            results = []
+            error = e
+        else:
+            error = ConnectionError("Trello batch response is missing a result.")
+
+        for position, (_, _, future) in enumerate(items):
+            if future.done():
+                continue
+            if position >= len(results):
+                future.set_exception(error)
+            elif "200" in results[position]:
+                future.set_result(results[position]["200"])
+            else:
+                future.set_exception(self._error(results[position]))
+
+    @staticmethod
+    def _route(path: str, params: Optional[dict]) -> str:
+        return f"{path}?{urlencode(params)}" if params else path
+
+    @staticmethod
+    def _error(result: dict) -> Exception:
+        for key, value in result.items():
+            if key.isdigit():
+                return TrelloResponseError(int(key), json.dumps(value))
+        return TrelloResponseError(int(result.get("statusCode", 500)), json.dumps(result))
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "requests": self.requests,
+            "batches": self.batches
+        }
+
+
+trello_batcher = TrelloBatcher(window=microservice.trello_batch_window)
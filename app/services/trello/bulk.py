@@ -0,0 +1,123 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from app.services.trello.add_card.config import Card
+from app.services.trello.credentials import TrelloCredentials
+from app.services.trello.errors import TrelloResponseError
+from app.services.trello.trello_client import TrelloClient
+from app.utils.converter import convert_errors
+
+ADD_CARD = "add_card"
+MOVE_CARD = "move_card"
+DELETE_CARD = "delete_card"
+ADD_MEMBER = "add_member"
+OPERATIONS = (ADD_CARD, MOVE_CARD, DELETE_CARD, ADD_MEMBER)
+
+
+class BulkCardRef(BaseModel):
+    card_name: str
+
+
+class BulkMember(BaseModel):
+    card_name: str
+    member_id: str
+
+
+class TrelloBulkRequest(BaseModel):
+    credentials: TrelloCredentials
+    board_url: str
+    list_name: str
+    target_list_name: Optional[str] = None
+    items: List[dict]
+    concurrency: Optional[int] = None
+
+
+class TrelloBulk:
+    """
+    Runs one Trello operation for many items. Board, list and card lookups are done once for the
+    whole request, then the mutations run concurrently under the Trello rate limit.
+    """
+
+    def __init__(self, operation: str, request: TrelloBulkRequest, concurrency: int):
+        self.operation = operation
+        self.request = request
+        self.concurrency = max(1, request.concurrency or concurrency)
+        self.client = TrelloClient(request.credentials.api_key, request.credentials.token)
+        self.list_id: Optional[str] = None
+        self.target_list_id: Optional[str] = None
+        self.index: Dict[str, str] = {}
+
+    async def resolve(self) -> None:
+        """
+        Resolves lists and reads the card index. Raises ValueError if the board or a list does not exist.
+        """
+        if self.operation == MOVE_CARD:
+            if not self.request.target_list_name:
+                raise ValueError("Target list name is required to move cards.")
+            self.list_id, self.target_list_id = await self.client.get_list_ids(
+                self.request.board_url,
+                [self.request.list_name, self.request.target_list_name]
+            )
+        else:
+            self.list_id = await self.client.get_list_id(self.request.board_url, self.request.list_name)
+
+        if self.operation != ADD_CARD:
+            self.index = await self.client.index_cards(self.list_id)
+
+    def _card_name(self, item: dict) -> str:
+        card_name = BulkCardRef(**item).card_name
+        if card_name not in self.index:
+            raise ValueError("Given card does not exist.")
+        return card_name
+
+    def _mutation(self, item: dict) -> Callable[[], Awaitable[dict]]:
+        if self.operation == ADD_CARD:
+            card = Card(**item)
+            return lambda: self.client.add_card(self.list_id, **card.dict())
+        if self.operation == MOVE_CARD:
+            card_name = self._card_name(item)
+            return lambda: self.client.move_card(self.list_id, self.target_list_id, card_name)
+        if self.operation == DELETE_CARD:
+            card_name = self._card_name(item)
+            return lambda: self.client.delete_card(self.list_id, card_name)
+        member = BulkMember(**item)
+        self._card_name(item)
+        return lambda: self._add_member(member)
+
+    async def _add_member(self, member: BulkMember) -> dict:
+        member_id = await self.client.get_member_id(self.request.board_url, member.member_id)
+        return await self.client.add_member(self.list_id, member.card_name, member_id)
+
+    async def _run_item(self, position: int, item: dict, semaphore: asyncio.Semaphore) -> dict:
+        try:
+            mutation = self._mutation(item)
+            async with semaphore:
+                return {"index": position, "status": 200, "response": await mutation()}
+        except ValidationError as e:
+            return {"index": position, "status": 422, "detail": convert_errors(e)}
+        except ValueError as e:
+            return {"index": position, "status": 404, "detail": str(e)}
+        except TrelloResponseError as e:
+            return {"index": position, "status": e.status, "detail": str(e)}
+        except ConnectionError as e:
+            return {"index": position, "status": 502, "detail": str(e)}
+        except Exception as e:
+            return {"index": position, "status": 500, "detail": str(e)}
+
+    async def run(self) -> AsyncIterator[dict]:
+        """
+        Yields the result of every item as soon as it is done. Each result has the position of the item
+        in the request.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._run_item(position, item, semaphore))
+                 for position, item in enumerate(self.request.items)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # The client went away, the remaining items are not sent to Trello.
+            for task in tasks:
+                task.cancel()
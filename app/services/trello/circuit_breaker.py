@@ -0,0 +1,104 @@
+from collections import Counter
+from time import monotonic
+from typing import Dict, Hashable
+
+from app.config import microservice
+from app.services.trello.errors import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Circuit:
+    """
+    Closed lets requests through and counts consecutive failures. After `threshold` failures it opens
+    and rejects requests for `reset_timeout` seconds (threshold 0 never opens). Then it is half-open and lets one probe through:
+    success closes it, failure opens it again.
+    """
+
+    def __init__(self, host: str, threshold: int, reset_timeout: float, transitions: Counter):
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.transitions = transitions
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def _move(self, state: str) -> None:
+        if state != self.state:
+            self.transitions[f"{self.state}->{state}"] += 1
+            self.state = state
+
+    def before(self) -> bool:
+        """
+        Raises CircuitOpenError if the request must not be sent. Returns True if the request is the probe.
+        """
+        if self.state == OPEN:
+            retry_in = self.opened_at + self.reset_timeout - monotonic()
+            if retry_in > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, retry_in)
+            self._move(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.host, 0.)
+            self.probing = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        self._move(CLOSED)
+
+    def release(self) -> None:
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or 0 < self.threshold <= self.failures:
+            self.opened_at = monotonic()
+            self._move(OPEN)
+
+
+class CircuitBreaker:
+    """
+    One circuit per Trello host and token, so a revoked or throttled token does not stop the others.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.transitions = Counter()
+        self._circuits: Dict[Hashable, Circuit] = {}
+
+    def circuit(self, host: str, token: str) -> Circuit:
+        key = (host, token)
+        circuit = self._circuits.get(key, None)
+        if circuit is None:
+            circuit = self._circuits[key] = Circuit(host, self.threshold, self.reset_timeout, self.transitions)
+        return circuit
+
+    def stats(self) -> dict:
+        circuits = list(self._circuits.values())
+        return {
+            "circuits": len(circuits),
+            "closed": sum(1 for circuit in circuits if circuit.state == CLOSED),
+            "open": sum(1 for circuit in circuits if circuit.state == OPEN),
+            "half_open": sum(1 for circuit in circuits if circuit.state == HALF_OPEN),
+            "rejected": sum(circuit.rejected for circuit in circuits),
+            "transitions": dict(self.transitions)
+        }
+
+
+trello_circuit_breaker = CircuitBreaker(
+    threshold=microservice.trello_breaker_threshold,
+    reset_timeout=microservice.trello_breaker_reset_timeout
+)
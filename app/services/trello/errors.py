@@ -0,0 +1,12 @@
+class TrelloResponseError(ConnectionError):
+
+    def __init__(self, status: int, message: str):
+        super().__init__("Expected response status 200 got {} with message {}".format(status, message))
+        self.status = status
+
+
+class CircuitOpenError(ConnectionError):
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__("Trello at {} keeps failing, requests are stopped. Try again later.".format(host))
+        self.retry_in = retry_in
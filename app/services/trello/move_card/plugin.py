@@ -13,8 +13,8 @@ async def validate(config: dict, credentials: Optional[dict]) -> Config:
     credentials = TrelloCredentials(**credentials)
     plugin_config = Config(**config)
     client = TrelloClient(credentials.api_key, credentials.token)
-    list_id1 = await client.get_list_id(plugin_config.board_url, plugin_config.list_name1)
-    list_id2 = await client.get_list_id(plugin_config.board_url, plugin_config.list_name2)
+    list_id1, list_id2 = await client.get_list_ids(plugin_config.board_url,
+                                                   [plugin_config.list_name1, plugin_config.list_name2])
     plugin_config = Config(**plugin_config.dict(exclude={"list_id1", "list_id2"}), list_id1=list_id1, list_id2=list_id2)
     return plugin_config
 
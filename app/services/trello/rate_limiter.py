@@ -0,0 +1,136 @@
+import asyncio
+from time import monotonic
+from typing import Dict, Optional
+
+from app.config import microservice
+
+
+class TokenBucket:
+    """
+    Token bucket that queues callers until a request may be sent. Waiting callers are served in
+    arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """
+        Waits for a free slot and returns the time spent waiting.
+        """
+        start = monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = monotonic()
+                    if now < self.paused_until:
+                        await asyncio.sleep(self.paused_until - now)
+                        continue
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+        waited = monotonic() - start
+        self.acquired += 1
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        return waited
+
+    async def wait_pause(self) -> float:
+        """
+        Waits until the pause set by pause() is over and returns the time spent waiting.
+        """
+        start = monotonic()
+        while monotonic() < self.paused_until:
+            await asyncio.sleep(self.paused_until - monotonic())
+        return monotonic() - start
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops sending for the given time, e.g. after Trello answered 429.
+        """
+        self.throttled += 1
+        self.paused_until = max(self.paused_until, monotonic() + seconds)
+        self.tokens = 0
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait_time": self.wait_time / self.acquired if self.acquired else 0.0,
+            "max_wait_time": self.max_wait_time
+        }
+
+
+class TrelloRateLimiter:
+    """
+    One token bucket per Trello token. Trello allows 100 requests per 10 seconds per token, the
+    defaults keep any 10 second window below that.
+    """
+
+    def __init__(self, rate: float, burst: float, max_throttled_retries: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_throttled_retries = max_throttled_retries
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, token: str) -> TokenBucket:
+        bucket = self._buckets.get(token, None)
+        if bucket is None:
+            bucket = self._buckets[token] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def acquire(self, token: str) -> float:
+        if self.rate <= 0:
+            # No rate limit, but Retry-After of a 429 from Trello is still respected.
+            bucket = self._buckets.get(token, None)
+            return await bucket.wait_pause() if bucket is not None else 0.0
+        return await self.bucket(token).acquire()
+
+    def throttle(self, token: str, retry_after: Optional[str]) -> float:
+        try:
+            seconds = max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            seconds = 1.0
+        self.bucket(token).pause(seconds)
+        return seconds
+
+    def stats(self) -> dict:
+        buckets = list(self._buckets.values())
+        acquired = sum(bucket.acquired for bucket in buckets)
+        return {
+            "tokens": len(buckets),
+            "queue_depth": sum(bucket.waiting for bucket in buckets),
+            "acquired": acquired,
+            "throttled": sum(bucket.throttled for bucket in buckets),
+            "avg_wait_time": sum(bucket.wait_time for bucket in buckets) / acquired if acquired else 0.0,
+            "max_wait_time": max([bucket.max_wait_time for bucket in buckets], default=0.0)
+        }
+
+
+trello_rate_limiter = TrelloRateLimiter(
+    rate=microservice.trello_rate_limit,
+    burst=microservice.trello_rate_burst,
+    max_throttled_retries=microservice.trello_rate_max_retries
+)
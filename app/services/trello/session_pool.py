@@ -0,0 +1,92 @@
+from typing import Optional
+
+import aiohttp
+
+from app.config import microservice
+
+
+class TrelloSessionPool:
+    """
+    Process-wide HTTP session for outbound Trello traffic. Connections are kept alive and reused,
+    DNS answers are cached. The session is created lazily inside the running event loop and closed
+    on application shutdown.
+    """
+
+    def __init__(self, limit: int, limit_per_host: int, keepalive_timeout: float, dns_ttl: int, timeout: float):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.waiting = 0
+        self.created = 0
+        self.reused = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, context, params):
+            self.waiting += 1
+
+        async def on_queued_end(session, context, params):
+            self.waiting -= 1
+
+        async def on_create_end(session, context, params):
+            self.created += 1
+
+        async def on_reuse(session, context, params):
+            self.reused += 1
+
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> dict:
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        # aiohttp does not expose pool state publicly.
+        active = len(getattr(connector, '_acquired', ())) if connector is not None else 0
+        idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values()) if connector is not None else 0
+        return {
+            "open": active + idle,
+            "active": active,
+            "idle": idle,
+            "waiting": self.waiting,
+            "created": self.created,
+            "reused": self.reused,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host
+        }
+
+
+trello_session_pool = TrelloSessionPool(
+    limit=microservice.trello_pool_size,
+    limit_per_host=microservice.trello_pool_size_per_host,
+    keepalive_timeout=microservice.trello_keepalive_timeout,
+    dns_ttl=microservice.trello_dns_ttl,
+    timeout=microservice.trello_timeout
+)
@@ -0,0 +1,184 @@
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from app.config import microservice
+from app.utils.ttl_cache import TtlCache, MISSING
+
+# Stored for names that Trello does not know, so repeated lookups of a wrong name do not hit the API.
+NOT_FOUND = None
+
+
+def credentials_key(api_key: str, token: str) -> str:
+    return hashlib.sha256(f"{api_key}:{token}".encode()).hexdigest()
+
+
+class TrelloIndexCache:
+    """
+    Board URL -> board id, (board id, list name) -> list id and (board id, member) -> member id
+    maps per Trello credential, plus a card name -> card id index per list.
+    Lookups return MISSING when the cache has no answer and NOT_FOUND when Trello did not know the name.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self.boards = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.lists = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.cards = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.members = TtlCache(maxsize=maxsize, ttl=ttl)
+
+    def get_board_id(self, credentials: str, board_url: str) -> Any:
+        return self.boards.get((credentials, board_url), MISSING)
+
+    def set_boards(self, credentials: str, boards: List[dict], board_url: str) -> Optional[str]:
+        for board in boards:
+            self.boards.set((credentials, board["url"]), board["id"])
+        board_id = self.boards.peek((credentials, board_url), MISSING)
+        if board_id is MISSING:
+            self.boards.set((credentials, board_url), NOT_FOUND, ttl=self.negative_ttl)
+            return NOT_FOUND
+        return board_id
+
+    def get_list_id(self, credentials: str, board_id: str, list_name: str) -> Any:
+        return self.lists.get((credentials, board_id, list_name), MISSING)
+
+    def set_lists(self, credentials: str, board_id: str, lists: List[dict], list_name: str) -> Optional[str]:
+        for trello_list in lists:
+            self.lists.set((credentials, board_id, trello_list["name"]), trello_list["id"])
+        list_id = self.lists.peek((credentials, board_id, list_name), MISSING)
+        if list_id is MISSING:
+            self.lists.set((credentials, board_id, list_name), NOT_FOUND, ttl=self.negative_ttl)
+            return NOT_FOUND
+        return list_id
+
+    def get_member_id(self, credentials: str, board_id: str, member: str) -> Any:
+        return self.members.get((credentials, board_id, member), MISSING)
+
+    def set_members(self, credentials: str, board_id: str, members: List[dict], member: str) -> Optional[str]:
+        # Members are found by id or by username, usernames in Trello are lower case.
+        for board_member in members:
+            self.members.set((credentials, board_id, board_member["id"]), board_member["id"])
+            if board_member.get("username", None):
+                self.members.set((credentials, board_id, board_member["username"].lower()), board_member["id"])
+        return self.set_member(credentials, board_id, member, self.members.peek((credentials, board_id, member), None))
+
+    def set_member(self, credentials: str, board_id: str, member: str, member_id: Optional[str]) -> Optional[str]:
+        if member_id is None:
+            self.members.set((credentials, board_id, member), NOT_FOUND, ttl=self.negative_ttl)
+            return NOT_FOUND
+        self.members.set((credentials, board_id, member), member_id)
+        return member_id
+
+    def get_card_id(self, credentials: str, list_id: str, card_name: str) -> Any:
+        index = self.cards.get((credentials, list_id), None)
+        if index is None:
+            return MISSING
+        return index.get(card_name, MISSING)
+
+    def set_cards(self, credentials: str, list_id: str, cards: List[dict], complete: bool = True) -> Dict[str, str]:
+        """
+        Replaces the list index with the cards. If the cards are only a part of the list they are
+        merged into the existing index. Of cards with the same name the first one in the list is kept,
+        the same card a read that stops at the first match finds.
+        """
+        index = {}
+        for card in cards:
+            index.setdefault(card["name"], card["id"])
+        if not complete:
+            # The cards are the top of the list, so they come before the indexed cards of the same name.
+            index = {**(self.cards.peek((credentials, list_id), None) or {}), **index}
+        self.cards.set((credentials, list_id), index)
+        return index
+
+    def add_card(self, credentials: str, list_id: str, card_name: str, card_id: str) -> None:
+        # Only lists that are already indexed are updated, the others are read on the first lookup.
+        index = self.cards.peek((credentials, list_id), None)
+        if index is not None:
+            # A card with this name that is already indexed comes first in the list.
+            index.setdefault(card_name, card_id)
+
+    def remove_card(self, credentials: str, list_id: str, card_name: str, card_id: str) -> None:
+        index = self.cards.peek((credentials, list_id), None)
+        if index is not None and index.get(card_name, None) == card_id:
+            del index[card_name]
+
+    def _list_indexes(self, list_id: Optional[str]) -> List[Dict[str, str]]:
+        indexes = [self.cards.peek(key, None) for key in self.cards.keys() if list_id is None or key[1] == list_id]
+        return [index for index in indexes if index is not None]
+
+    def add_card_for_all(self, list_id: str, card_name: str, card_id: str) -> int:
+        """
+        Adds the card to the index of the list for every credential that has the list indexed, e.g. when
+        Trello reports a new card. Returns the number of updated indexes.
+        """
+        indexes = self._list_indexes(list_id)
+        for index in indexes:
+            index.setdefault(card_name, card_id)
+        return len(indexes)
+
+    def remove_card_for_all(self, list_id: Optional[str], card_id: str) -> int:
+        """
+        Removes the card from the index of the list, or of all lists if list_id is None, for every
+        credential. Cards are matched by id as Trello does not send the name of a deleted card.
+        """
+        removed = 0
+        for index in self._list_indexes(list_id):
+            for card_name in [name for name, indexed_id in index.items() if indexed_id == card_id]:
+                del index[card_name]
+                removed += 1
+        return removed
+
+    def invalidate_lists(self, board_id: str) -> None:
+        # List names of the board changed, they are read again on the next lookup for every credential.
+        for key in self.lists.keys():
+            if key[1] == board_id:
+                self.lists.pop(key)
+
+    def invalidate_cards(self, credentials: str, list_id: str) -> None:
+        self.cards.pop((credentials, list_id))
+
+    def invalidate(self, credentials: Optional[str] = None, board_id: Optional[str] = None) -> None:
+        """
+        Drops cached entries of the credentials and/or the board, together with the card indexes
+        of the dropped lists. With no arguments everything is dropped.
+        """
+        if credentials is None and board_id is None:
+            self.boards.clear()
+            self.lists.clear()
+            self.cards.clear()
+            self.members.clear()
+            return
+
+        def matches(key) -> bool:
+            return credentials is None or key[0] == credentials
+
+        for key in self.boards.keys():
+            if matches(key) and (board_id is None or self.boards.peek(key) == board_id):
+                self.boards.pop(key)
+
+        list_ids = set()
+        for key in self.lists.keys():
+            if matches(key) and (board_id is None or key[1] == board_id):
+                list_ids.add(self.lists.pop(key))
+
+        for key in self.cards.keys():
+            if matches(key) and (board_id is None or key[1] in list_ids):
+                self.cards.pop(key)
+
+        for key in self.members.keys():
+            if matches(key) and (board_id is None or key[1] == board_id):
+                self.members.pop(key)
+
+    def stats(self) -> dict:
+        return {
+            "boards": self.boards.stats(),
+            "lists": self.lists.stats(),
+            "cards": self.cards.stats(),
+            "members": self.members.stats()
+        }
+
+
+trello_cache = TrelloIndexCache(
+    maxsize=microservice.trello_cache_size,
+    ttl=microservice.trello_cache_ttl,
+    negative_ttl=microservice.trello_cache_negative_ttl
+)
@@ -1,4 +1,30 @@
-from tracardi.service.tracardi_http_client import HttpClient
+import asyncio
+import random
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from app.config import microservice
+from app.services.trello.batcher import trello_batcher
+from app.services.trello.circuit_breaker import trello_circuit_breaker
+from app.services.trello.errors import TrelloResponseError
+from app.services.trello.rate_limiter import trello_rate_limiter
+from app.services.trello.session_pool import trello_session_pool
+from app.services.trello.trello_cache import trello_cache, credentials_key, NOT_FOUND
+from app.utils.json_stream import iter_json_array
+from app.utils.singleflight import SingleFlight
+from app.utils.ttl_cache import MISSING
+
+TRELLO_API_URL = microservice.trello_api_url.rstrip("/")
+TRELLO_HOST = urlparse(TRELLO_API_URL).netloc
+RETRY_STATUSES = {500, 502, 503, 504}
+CARD_FIELDS = "id,name,idList"
+# Max number of results of Trello member search.
+MEMBER_SEARCH_LIMIT = 20
+
+trello_flight = SingleFlight()
 
 
 class TrelloClient:
@@ -6,144 +32,308 @@ class TrelloClient:
     def __init__(self, api_key: str, token: str):
         self.api_key = api_key
         self.token = token
+        self.credentials = credentials_key(api_key, token)
         self.retries = 1
 
     def set_retries(self, retries: int) -> None:
         self.retries = retries
 
+    async def _open(self, method: str, path: str, params: Optional[dict] = None,
+                    data: Optional[dict] = None) -> aiohttp.ClientResponse:
+        """
+        Sends the request and returns the response with status 200. The caller must release it.
+        """
+        attempts = max(1, self.retries)
+        params = {"key": self.api_key, "token": self.token, **(params or {})}
+        circuit = trello_circuit_breaker.circuit(TRELLO_HOST, self.credentials)
+        attempt = 0
+        throttled = 0
+
+        while True:
+            attempt += 1
+            await trello_rate_limiter.acquire(self.credentials)
+            # Fails fast with CircuitOpenError while Trello keeps failing for these credentials. Checked after
+            # the rate limiter wait, so the state is current when the request is sent.
+            probe = circuit.before()
+            try:
+                response = await trello_session_pool.session.request(
+                    method,
+                    f"{TRELLO_API_URL}{path}",
+                    params=params,
+                    data=data
+                )
+                if response.status in RETRY_STATUSES:
+                    circuit.failure()
+                else:
+                    circuit.success()
+
+                if response.status == 200:
+                    return response
+                try:
+                    message = await response.text()
+                finally:
+                    response.release()
+
+                if response.status == 429 and throttled < trello_rate_limiter.max_throttled_retries:
+                    # Over the Trello quota. Queue the request again, it does not count as a failed attempt.
+                    throttled += 1
+                    attempt -= 1
+                    trello_rate_limiter.throttle(self.credentials, response.headers.get("Retry-After", None))
+                    continue
+
+                if response.status not in RETRY_STATUSES or attempt >= attempts:
+                    raise TrelloResponseError(response.status, message)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                circuit.failure()
+                if attempt >= attempts:
+                    raise ConnectionError(f"Could not connect to Trello. Reason: {repr(e)}") from e
+            finally:
+                if probe:
+                    # Cancelled or failed with an unexpected error, the next request probes.
+                    circuit.release()
+
+            await asyncio.sleep(self._backoff(attempt))
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter spreads retries of many callers that failed at the same time.
+        return random.uniform(0, min(microservice.trello_retry_max_backoff,
+                                     microservice.trello_retry_backoff * 2 ** (attempt - 1)))
+
+    async def _send(self, method: str, path: str, params: Optional[dict] = None, data: Optional[dict] = None) -> Any:
+        response = await self._open(method, path, params, data)
+        try:
+            return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ConnectionError(f"Could not read Trello response. Reason: {repr(e)}") from e
+        finally:
+            response.release()
+
+    async def _stream(self, path: str, params: Optional[dict] = None) -> AsyncIterator[dict]:
+        """
+        Yields items of a JSON array response while it is being downloaded. If the caller stops early
+        the rest of the response is not read.
+        """
+        response = await self._open("GET", path, params)
+        complete = False
+        try:
+            async for item in iter_json_array(response.content):
+                yield item
+            complete = True
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            # A ValueError is a truncated or malformed body, not a missing board, list or card.
+            raise ConnectionError(f"Could not read Trello response. Reason: {repr(e)}") from e
+        finally:
+            if complete:
+                response.release()
+            else:
+                # The rest of the response was not read, the connection can not be reused.
+                response.close()
+
+    async def _fetch(self, path: str, params: Optional[dict] = None) -> Any:
+        if trello_batcher.enabled:
+            return await trello_batcher.get(self, path, params)
+        return await self._send("GET", path, params)
+
+    async def _get(self, path: str, params: Optional[dict] = None) -> Any:
+        # Identical GETs in flight for the same credentials share one request.
+        key = (self.credentials, path, tuple(sorted((params or {}).items())))
+        return await trello_flight.do(key, lambda: self._fetch(path, params))
+
+    def invalidate_cache(self, board_id: Optional[str] = None) -> None:
+        trello_cache.invalidate(self.credentials, board_id)
+
+    async def get_board_id(self, board_url: str) -> str:
+        board_id = trello_cache.get_board_id(self.credentials, board_url)
+        if board_id is MISSING:
+            boards = await self._get("/members/me/boards")
+            board_id = trello_cache.set_boards(self.credentials, boards, board_url)
+        if board_id is NOT_FOUND:
+            raise ValueError("Given board does not exist")
+        return board_id
+
     async def get_list_id(self, board_url: str, list_name: str) -> str:
+        list_id, = await self.get_list_ids(board_url, [list_name])
+        return list_id
 
-        async with HttpClient(self.retries) as client:
-            async with client.get(
-                    url=f'https://api.trello.com/1/members/me/boards?key={self.api_key}&token={self.token}'
-            ) as response:
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                result = await response.json()
-                boards = list(filter(lambda x: x["url"] == board_url, result))
-                if not boards:
-                    raise ValueError("Given board does not exist")
-
-            async with client.get(
-                    url=f'https://api.trello.com/1/boards/{boards.pop()["id"]}/lists?'
-                        f'key={self.api_key}&token={self.token}'
-            ) as response:
-
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                result = await response.json()
-                lists = list(filter(lambda x: x["name"] == list_name, result))
-                if not lists:
-                    raise ValueError("Given list does not exist.")
-                return lists.pop()["id"]
+    async def get_list_ids(self, board_url: str, list_names: List[str]) -> List[str]:
+        """
+        Returns ids of the lists on one board in the order of the names. Boards and lists are fetched
+        at most once, however many names are not cached.
+        """
+        board_id = await self.get_board_id(board_url)
 
-    async def add_card(self, list_id: str, **kwargs) -> dict:
+        list_ids = [trello_cache.get_list_id(self.credentials, board_id, list_name) for list_name in list_names]
+        if MISSING in list_ids:
+            lists = await self._get(f"/boards/{board_id}/lists")
+            list_ids = [
+                trello_cache.set_lists(self.credentials, board_id, lists, list_name) if list_id is MISSING else list_id
+                for list_name, list_id in zip(list_names, list_ids)
+            ]
+        for list_name, list_id in zip(list_names, list_ids):
+            if list_id is NOT_FOUND:
+                raise ValueError(f"Given list {list_name} does not exist.")
+        return list_ids
 
-        async with HttpClient(self.retries) as client:
-            async with client.post(
-                    url=f"https://api.trello.com/1/cards?key={self.api_key}&token={self.token}",
-                    params={
-                        "idList": list_id
-                    },
-                    data={key: val for key, val in kwargs.items() if val is not None}
-            ) as response:
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-
-                return await response.json()
+    async def get_member_id(self, board_url: str, member: str) -> str:
+        """
+        Returns id of the board member given by id, username or email. Board members are fetched once and
+        kept in the member index. Trello does not return emails of board members, so an email is looked up
+        with member search on the board and the answer is kept in the same index. An email that does not
+        match exactly one member is not found.
+        """
+        board_id = await self.get_board_id(board_url)
+        member = member.strip().lstrip("@").lower()
 
-    async def delete_card(self, list_id: str, card_name: str) -> dict:
-        async with HttpClient(self.retries) as client:
-            async with client.get(
-                    url=f"https://api.trello.com/1/lists/{list_id}/cards?key={self.api_key}&token={self.token}"
-            ) as response:
+        member_id = trello_cache.get_member_id(self.credentials, board_id, member)
+        if member_id is MISSING:
+            if "@" in member:
+                # Member search is fuzzy, so only a single exact email match is taken.
+                found = await self._get("/search/members", {"query": member, "idBoard": board_id,
+                                                            "limit": MEMBER_SEARCH_LIMIT})
+                matches = {found_member["id"] for found_member in found
+                           if (found_member.get("email", None) or "").lower() == member}
+                member_id = trello_cache.set_member(self.credentials, board_id, member,
+                                                    matches.pop() if len(matches) == 1 else None)
+            else:
+                members = await self._get(f"/boards/{board_id}/members")
+                member_id = trello_cache.set_members(self.credentials, board_id, members, member)
+        if member_id is NOT_FOUND:
+            raise ValueError("Given member does not exist on the board.")
+        return member_id
 
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                result = await response.json()
-                cards = list(filter(lambda x: x["name"] == card_name, result))
+    async def _get_card_id(self, list_id: str, card_name: str, refresh: bool = False) -> Tuple[str, bool]:
+        """
+        Returns card id and whether it came from the card index.
+        """
+        if not refresh:
+            card_id = trello_cache.get_card_id(self.credentials, list_id, card_name)
+            if card_id is not MISSING:
+                return card_id, True
 
-                if not cards:
-                    raise ValueError("Given card does not exist.")
+        # Concurrent lookups on the same list share one read. The read stops at the card of the caller
+        # that started it. Callers whose cards were not reached share one read of the whole list, instead
+        # of each starting a read from the top of the list.
+        index, complete = await trello_flight.do(
+            (self.credentials, "cards", list_id),
+            lambda: self._read_cards(list_id, card_name)
+        )
+        card_id = index.get(card_name, None)
+        if card_id is None and not complete:
+            card_id = (await self.index_cards(list_id)).get(card_name, None)
+        if card_id is None:
+            raise ValueError("Given card does not exist.")
+        return card_id, False
 
-                card_id = cards.pop()["id"]
+    async def index_cards(self, list_id: str) -> Dict[str, str]:
+        """
+        Reads the whole list into the card index, so many card operations on the list need one read.
+        """
+        index, _ = await trello_flight.do(
+            (self.credentials, "cards", list_id, "all"),
+            lambda: self._read_cards(list_id, None)
+        )
+        return index
 
-            async with client.delete(
-                    url=f"https://api.trello.com/1/cards/{card_id}?key={self.api_key}&token={self.token}"
-            ) as response:
+    async def _read_cards(self, list_id: str, card_name: Optional[str]) -> Tuple[Dict[str, str], bool]:
+        """
+        Reads the list into the card index until the card is found. Returns the index and whether
+        the whole list was read.
+        """
+        # Only the fields needed for the index are downloaded.
+        cards = []
+        complete = True
+        async with aclosing(self._stream(f"/lists/{list_id}/cards", params={"fields": CARD_FIELDS})) as stream:
+            async for card in stream:
+                cards.append(card)
+                if card["name"] == card_name:
+                    complete = False
+                    break
 
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
+        return trello_cache.set_cards(self.credentials, list_id, cards, complete=complete), complete
 
-                return await response.json()
+    async def _update_card(self, list_id: str, card_name: str,
+                           update: Callable[[str], Awaitable[dict]]) -> Tuple[str, dict]:
+        card_id, from_index = await self._get_card_id(list_id, card_name)
+        try:
+            return card_id, await update(card_id)
+        except TrelloResponseError as e:
+            # The card was removed in Trello after it was indexed. Read the list again and retry once.
+            if e.status != 404 or not from_index:
+                raise
+            trello_cache.remove_card(self.credentials, list_id, card_name, card_id)
+            card_id, _ = await self._get_card_id(list_id, card_name, refresh=True)
+            return card_id, await update(card_id)
+
+    async def add_card(self, list_id: str, **kwargs) -> dict:
+        result = await self._send(
+            "POST",
+            "/cards",
+            params={
+                "idList": list_id
+            },
+            data={key: val for key, val in kwargs.items() if val is not None}
+        )
+        trello_cache.add_card(self.credentials, list_id, result["name"], result["id"])
+        return result
+
+    async def delete_card(self, list_id: str, card_name: str) -> dict:
+        card_id, result = await self._update_card(
+            list_id,
+            card_name,
+            lambda card_id: self._send("DELETE", f"/cards/{card_id}")
+        )
+        trello_cache.remove_card(self.credentials, list_id, card_name, card_id)
+        return result
 
     async def move_card(self, current_list_id: str, list_id: str, card_name: str) -> dict:
-        async with HttpClient(self.retries) as client:
-            async with client.get(
-                    url=f"https://api.trello.com/1/lists/{current_list_id}/cards?key={self.api_key}&token={self.token}"
-            ) as response:
-
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                result = await response.json()
-                cards = list(filter(lambda x: x["name"] == card_name, result))
-
-                if not cards:
-                    raise ValueError("Given card does not exist.")
-
-                card_id = cards.pop()["id"]
-
-            async with client.put(
-                    url=f"https://api.trello.com/1/cards/{card_id}?key={self.api_key}&token={self.token}",
-                    data={
-                        "idList": list_id
-                    }
-            ) as response:
-
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                return await response.json()
+        card_id, result = await self._update_card(
+            current_list_id,
+            card_name,
+            lambda card_id: self._send(
+                "PUT",
+                f"/cards/{card_id}",
+                data={
+                    "idList": list_id
+                }
+            )
+        )
+        trello_cache.remove_card(self.credentials, current_list_id, card_name, card_id)
+        trello_cache.add_card(self.credentials, list_id, card_name, card_id)
+        return result
 
     async def add_member(self, list_id: str, card_name: str, member_id: str) -> dict:
-        async with HttpClient(self.retries) as client:
-            async with client.get(
-                    url=f"https://api.trello.com/1/lists/{list_id}/cards?key={self.api_key}&token={self.token}"
-            ) as response:
-
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-                result = await response.json()
-                cards = list(filter(lambda x: x["name"] == card_name, result))
-                if not cards:
-                    raise ValueError("Given card does not exist.")
-
-                card_id = cards.pop()["id"]
-
-            async with client.put(
-                    url=f"https://api.trello.com/1/cards/{card_id}/idMembers?key={self.api_key}&token={self.token}",
-                    data={
-                        "value": member_id
-                    }
-            ) as response:
-                if response.status != 200:
-                    raise ConnectionError("Expected response status 200 got {} "
-                                          "with message {}".format(response.status,
-                                                                   await response.text()))
-
-                return await response.json()
+        _, result = await self._update_card(
+            list_id,
+            card_name,
+            lambda card_id: self._send(
+                "PUT",
+                f"/cards/{card_id}/idMembers",
+                data={
+                    "value": member_id
+                }
+            )
+        )
+        return result
+
+    async def register_webhook(self, board_url: str, callback_url: str, description: str = "") -> dict:
+        """
+        Registers a webhook that sends actions on the board to the callback. Trello checks the callback
+        with a HEAD request before it accepts the webhook.
+        """
+        board_id = await self.get_board_id(board_url)
+        return await self._send(
+            "POST",
+            "/webhooks",
+            data={
+                "callbackURL": callback_url,
+                "idModel": board_id,
+                "description": description
+            }
+        )
+
+    async def get_webhooks(self) -> List[dict]:
+        return await self._send("GET", f"/tokens/{self.token}/webhooks")
+
+    async def delete_webhook(self, webhook_id: str) -> dict:
+        return await self._send("DELETE", f"/webhooks/{webhook_id}")
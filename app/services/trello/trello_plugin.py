@@ -7,6 +7,9 @@ from tracardi.service.wf.domain.node import Node
 class TrelloPlugin(ActionRunner):
     _client: TrelloClient
 
+    # Background jobs of Trello mutations are kept in the outbox until they succeed.
+    durable = True
+
     def set_up_trello(self, node: Node):
         credentials = TrelloCredentials(**node.microservice.plugin.resource)
         client = TrelloClient(credentials.api_key, credentials.token)
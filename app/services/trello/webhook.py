@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import hmac
+from collections import Counter
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.services.trello.credentials import TrelloCredentials
+from app.services.trello.trello_cache import trello_cache
+
+# Actions that add a card to a list, their data has the card and the list.
+CARD_CREATED = {"createCard", "copyCard", "convertToCardFromCheckItem", "moveCardToBoard"}
+# Actions that take a card away from a list.
+CARD_REMOVED = {"deleteCard", "moveCardFromBoard"}
+LIST_CHANGED = {"createList", "updateList", "moveListToBoard", "moveListFromBoard"}
+
+webhook_stats = Counter()
+
+
+class TrelloWebhookRegistration(BaseModel):
+    credentials: TrelloCredentials
+    board_url: str
+    description: str = "Tracardi microservice cache"
+
+
+class TrelloWebhookRemoval(BaseModel):
+    credentials: TrelloCredentials
+    webhook_id: str
+
+
+def signature(body: bytes, callback_url: str, secret: str) -> str:
+    digest = hmac.new(secret.encode(), body + callback_url.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+def verify_signature(body: bytes, callback_url: str, secret: str, header: Optional[str]) -> bool:
+    """
+    Checks the X-Trello-Webhook header: base64 of HMAC-SHA1 of the body and the callback URL signed
+    with the secret of the application that registered the webhook.
+    """
+    if not secret or not header:
+        return False
+    return hmac.compare_digest(signature(body, callback_url, secret), header)
+
+
+def _id(data: dict, name: str) -> Optional[str]:
+    return (data.get(name, None) or {}).get("id", None)
+
+
+def apply_action(action: dict) -> bool:
+    """
+    Applies a Trello action to the card and list indexes of all credentials. Returns False if the
+    action does not change any index.
+    """
+    action_type = action.get("type", None)
+    data = action.get("data", None) or {}
+    card = data.get("card", None) or {}
+    card_id = card.get("id", None)
+
+    if action_type in LIST_CHANGED:
+        board_id = _id(data, "board")
+        if board_id is None:
+            return False
+        trello_cache.invalidate_lists(board_id)
+        return True
+
+    if card_id is None:
+        return False
+
+    if action_type in CARD_CREATED:
+        list_id = _id(data, "list") or card.get("idList", None)
+        if list_id is None or "name" not in card:
+            return False
+        trello_cache.add_card_for_all(list_id, card["name"], card_id)
+        return True
+
+    if action_type in CARD_REMOVED:
+        trello_cache.remove_card_for_all(_id(data, "list"), card_id)
+        return True
+
+    if action_type == "updateCard":
+        old = data.get("old", None) or {}
+        if not {"name", "idList", "closed"} & set(old):
+            return False
+        # Renamed, moved, archived or restored. The card is removed wherever it was indexed and added
+        # back under its current name in its current list if it is still open.
+        trello_cache.remove_card_for_all(old.get("idList", None) or _id(data, "list"), card_id)
+        list_id = card.get("idList", None) or _id(data, "listAfter") or _id(data, "list")
+        if list_id is not None and "name" in card and not card.get("closed", False):
+            trello_cache.add_card_for_all(list_id, card["name"], card_id)
+        return True
+
+    return False
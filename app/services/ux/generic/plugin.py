@@ -5,7 +5,7 @@ from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form
     FormField, FormComponent
 from tracardi.service.plugin.domain.result import Result
 from tracardi.service.plugin.runner import ActionRunner
-from tracardi.service.notation.dict_traverser import DictTraverser
+from app.utils.reshape import compile_reshape, ReshapePlan
 
 
 async def validate(config: dict, credentials: Optional[dict]) -> Config:
@@ -14,14 +14,15 @@ async def validate(config: dict, credentials: Optional[dict]) -> Config:
 
 class GenericUixPlugin(ActionRunner):
     config: Config
+    _props_plan: ReshapePlan
 
     async def set_up(self, init):
         self.config = Config(**init)
+        self._props_plan = compile_reshape(self.config.props)
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         dot = self._get_dot_accessor(payload)
-        traverser = DictTraverser(dot)
-        props = traverser.reshape(self.config.props)
+        props = self._props_plan.run(dot)
         self.ux.append({
             "tag": "div",
             "props": props
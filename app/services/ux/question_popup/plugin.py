@@ -7,7 +7,7 @@ from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form
     FormField, FormComponent
 from tracardi.service.plugin.domain.result import Result
 from tracardi.service.plugin.runner import ActionRunner
-from tracardi.service.notation.dot_template import DotTemplate
+from app.utils.dot_template import render_template
 
 
 async def validate(config: dict, credentials: Optional[dict]) -> Config:
@@ -24,9 +24,7 @@ class QuestionPopupPlugin(ActionRunner):
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         dot = self._get_dot_accessor(payload)
-        template = DotTemplate()
-
-        content = template.render(self.config.content, dot)
+        content = render_template(self.config.content, dot)
 
         self.ux.append({
             "tag": "div",
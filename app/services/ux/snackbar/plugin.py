@@ -5,7 +5,7 @@ from tracardi.service.plugin.domain.register import Plugin, Spec, MetaData, Form
     FormField, FormComponent
 from tracardi.service.plugin.runner import ActionRunner
 from tracardi.service.plugin.domain.result import Result
-from tracardi.service.notation.dot_template import DotTemplate
+from app.utils.dot_template import render_template
 
 
 async def validate(config: dict, credentials: Optional[dict]) -> Configuration:
@@ -22,9 +22,7 @@ class SnackBarUx(ActionRunner):
 
     async def run(self, payload: dict, in_edge=None) -> Result:
         dot = self._get_dot_accessor(payload)
-        template = DotTemplate()
-
-        message = template.render(self.config.message, dot)
+        message = render_template(self.config.message, dot)
 
         self.ux.append({
             "tag": "div",
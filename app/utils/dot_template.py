@@ -0,0 +1,47 @@
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from tracardi.service.notation.dot_accessor import DotAccessor
+
+# Same placeholder syntax as tracardi DotTemplate, e.g. {{profile@traits.name}}
+PLACEHOLDER = re.compile(
+    r'\{{2}\s*((?:payload|profile|event|session|flow|memory)@[\[\]0-9a-zA-Z_\-\.]+(?<![\.\[]))\s*\}{2}'
+)
+
+
+class CompiledTemplate:
+    """
+    Template split once into literal text and dot paths. Rendering only reads the paths.
+    """
+
+    __slots__ = ("segments", "static")
+
+    def __init__(self, template: str):
+        self.segments: List[Tuple[bool, str]] = []
+        position = 0
+        for match in PLACEHOLDER.finditer(template):
+            if match.start() > position:
+                self.segments.append((False, template[position:match.start()]))
+            self.segments.append((True, match.group(1)))
+            position = match.end()
+        if position < len(template):
+            self.segments.append((False, template[position:]))
+
+        self.static: Optional[str] = template if all(not is_path for is_path, _ in self.segments) else None
+
+    def render(self, dot: DotAccessor) -> str:
+        if self.static is not None:
+            return self.static
+        return "".join([str(dot[value]) if is_path else value for is_path, value in self.segments])
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str) -> CompiledTemplate:
+    return CompiledTemplate(template)
+
+
+def render_template(template: Optional[str], dot: DotAccessor) -> Optional[str]:
+    if template is None:
+        return None
+    return compile_template(template).render(dot)
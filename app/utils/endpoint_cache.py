@@ -0,0 +1,58 @@
+import hashlib
+import json
+from typing import Any, Callable
+
+from app.utils.singleflight import SingleFlight
+from app.utils.ttl_cache import TtlCache, MISSING
+
+CACHE_ATTRIBUTE = '__endpoint_cache__'
+
+
+def cache_response(ttl: float, maxsize: int = 256):
+    """
+    Marks a PluginEndpoint method as cacheable. Responses are kept for `ttl` seconds per request body
+    and concurrent calls with the same body share one execution.
+
+    class Endpoint(PluginEndpoint):
+        @staticmethod
+        @cache_response(ttl=30)
+        async def boards(config: dict):
+            ...
+    """
+
+    def decorator(function: Callable) -> Callable:
+        setattr(function, CACHE_ATTRIBUTE, {"ttl": ttl, "maxsize": maxsize})
+        return function
+
+    return decorator
+
+
+def body_key(body: Any) -> str:
+    return hashlib.md5(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CachedEndpoint:
+
+    def __init__(self, function: Callable, is_async: bool, ttl: float, maxsize: int):
+        self.function = function
+        self.is_async = is_async
+        self.cache = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+
+    async def _call(self, key: str, body: Any) -> Any:
+        if self.is_async:
+            result = await self.function(body)
+        else:
+            result = self.function(body)
+        self.cache.set(key, result)
+        return result
+
+    async def __call__(self, body: Any) -> Any:
+        key = body_key(body)
+        result = self.cache.get(key, MISSING)
+        if result is not MISSING:
+            return result
+        return await self.flight.do(key, lambda: self._call(key, body))
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "coalesced": self.flight.coalesced}
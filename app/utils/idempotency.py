@@ -0,0 +1,42 @@
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+from app.utils.singleflight import SingleFlight
+from app.utils.ttl_cache import TtlCache, MISSING
+
+
+class IdempotencyStore:
+    """
+    Remembers responses by idempotency key. A retried request gets the stored response and the
+    call is not repeated. Concurrent requests with the same key share one call. Only responses for
+    which `cacheable` returns True are stored, so failed calls can be retried.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+        self.replayed = 0
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]],
+                  cacheable: Callable[[Any], bool] = lambda _: True) -> Tuple[Any, bool]:
+        """
+        Returns the response and whether it was replayed from the store.
+        """
+        response = self.cache.get(key, MISSING)
+        if response is not MISSING:
+            self.replayed += 1
+            return response, True
+
+        async def _call():
+            result = await function()
+            if cacheable(result):
+                self.cache.set(key, result)
+            return result
+
+        return await self.flight.do(key, _call), False
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "replayed": self.replayed,
+            **self.flight.stats()
+        }
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from time import time
+from typing import Awaitable, Callable, List, Optional, Set
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+
+from app.repo.domain import PluginExecContext, PluginJob
+from app.utils.outbox import Outbox
+from app.utils.ttl_cache import TtlCache
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class JobError(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs plugins in the background. Jobs wait in a bounded queue and are executed by a pool of
+    asyncio workers. Finished jobs are kept for `ttl` seconds so their status can be read.
+
+    Jobs for which `durable` returns True are written to the outbox before they are accepted. They
+    are retried with backoff, moved to the dead letter table when attempts run out and replayed
+    when the service starts again.
+    """
+
+    def __init__(self, runner: Callable[[str, str, PluginExecContext], Awaitable[dict]],
+                 workers: int, maxsize: int, ttl: float, outbox: Optional[Outbox] = None,
+                 durable: Optional[Callable[[str, str], bool]] = None):
+        self.runner = runner
+        self.workers = workers
+        self.maxsize = maxsize
+        self.outbox = outbox
+        self.durable = durable
+        self.jobs = TtlCache(maxsize=max(maxsize, 1) * 2, ttl=ttl)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._delayed: Set[asyncio.Task] = set()
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+        self.replayed = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.outbox is not None:
+            await self.outbox.open()
+            await self._replay()
+
+    async def stop(self) -> None:
+        # Durable jobs that are interrupted stay in the outbox and run again after the restart.
+        for task in [*self._tasks, *self._delayed]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._delayed, return_exceptions=True)
+        self._tasks = []
+        self._delayed = set()
+        if self.outbox is not None:
+            await self.outbox.close()
+
+    async def _replay(self) -> None:
+        now = time()
+        for job_id, service_id, action_id, data, attempts, next_at in await self.outbox.pending():
+            job = PluginJob(id=job_id, service_id=service_id, action_id=action_id, status="queued",
+                            created=now, attempts=attempts, durable=True)
+            self.jobs.set(job.id, job)
+            self._schedule(job, PluginExecContext.parse_raw(data), max(0., next_at - now))
+            self.replayed += 1
+        if self.replayed:
+            logger.info(f"Replayed {self.replayed} jobs from the outbox.")
+
+    def _schedule(self, job: PluginJob, data: PluginExecContext, delay: float) -> None:
+        task = asyncio.create_task(self._enqueue_later(job, data, delay))
+        self._delayed.add(task)
+        task.add_done_callback(self._delayed.discard)
+
+    async def _enqueue_later(self, job: PluginJob, data: PluginExecContext, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._queue.put((job, data))
+
+    async def submit(self, service_id: str, action_id: str, data: PluginExecContext) -> PluginJob:
+        """
+        Queues the job. Raises asyncio.QueueFull if the queue is full.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started.")
+        if self._queue.full():
+            raise asyncio.QueueFull()
+
+        durable = self.outbox is not None and self.durable is not None and self.durable(service_id, action_id)
+        job = PluginJob(id=str(uuid4()), service_id=service_id, action_id=action_id, status="queued",
+                        created=time(), durable=durable)
+        if durable:
+            await self.outbox.add(job.id, service_id, action_id, data.json())
+
+        self.jobs.set(job.id, job)
+        try:
+            self._queue.put_nowait((job, data))
+        except asyncio.QueueFull:
+            if not durable:
+                raise
+            # The job is already stored, it must not be rejected anymore.
+            self._schedule(job, data, 0)
+        return job
+
+    def get(self, job_id: str) -> Optional[PluginJob]:
+        return self.jobs.get(job_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            job, data = await self._queue.get()
+            try:
+                await self._run(job, data)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: PluginJob, data: PluginExecContext) -> None:
+        job.status = "running"
+        job.started = time()
+        job.attempts += 1
+        self.running += 1
+        try:
+            job.response = jsonable_encoder(await self.runner(job.service_id, job.action_id, data))
+            job.status = "done"
+            job.error = None
+            self.done += 1
+            if job.durable:
+                await self.outbox.done(job.id)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed. Reason: {repr(e)}")
+            job.error = str(e)
+            job.status = "failed"
+            if job.durable:
+                delay = await self.outbox.fail(job.id, job.attempts, job.error)
+                if delay is not None:
+                    job.status = "retrying"
+                    self._schedule(job, data, delay)
+                else:
+                    job.status = "dead"
+            if job.status != "retrying":
+                self.failed += 1
+        finally:
+            self.running -= 1
+            job.finished = time()
+            # Refreshes the expiry, the ttl counts from the end of the job.
+            self.jobs.set(job.id, job)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self.running,
+            "retrying": len(self._delayed),
+            "done": self.done,
+            "failed": self.failed,
+            "replayed": self.replayed
+        }
@@ -0,0 +1,48 @@
+import codecs
+import json
+from typing import AsyncIterator
+
+from aiohttp import StreamReader
+
+_WHITESPACE = " \t\n\r"
+
+
+async def iter_json_array(stream: StreamReader, chunk_size: int = 65536) -> AsyncIterator:
+    """
+    Yields items of a JSON array of objects as soon as each item is received, without buffering
+    the whole response.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+
+    async for chunk in stream.iter_chunked(chunk_size):
+        buffer += text_decoder.decode(chunk)
+        position = 0
+        length = len(buffer)
+
+        while True:
+            while position < length and (buffer[position] in _WHITESPACE or (started and buffer[position] == ",")):
+                position += 1
+            if position >= length:
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected JSON array.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Item is not complete yet, wait for more data.
+                break
+            yield item
+
+        buffer = buffer[position:]
+
+    # The closing bracket returns above, so the response ended before the array did.
+    raise ValueError("Unexpected end of JSON array.")
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import sqlite3
+from time import time
+from typing import Any, Callable, List, Optional, Tuple
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS outbox (
+        id TEXT PRIMARY KEY,
+        service_id TEXT NOT NULL,
+        action_id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_at REAL NOT NULL,
+        created REAL NOT NULL,
+        error TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS dead_letter (
+        id TEXT PRIMARY KEY,
+        service_id TEXT NOT NULL,
+        action_id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        created REAL NOT NULL,
+        failed REAL NOT NULL,
+        error TEXT
+    )"""
+]
+
+Operation = Callable[[sqlite3.Connection], Any]
+
+
+class Outbox:
+    """
+    Durable store of background jobs backed by SQLite in WAL mode. Writes from all coroutines are
+    grouped by one writer task and committed in a single transaction every `commit_interval` seconds,
+    so the disk is synced once per group and not once per job.
+    """
+
+    def __init__(self, path: str, commit_interval: float, max_attempts: int, backoff: float,
+                 max_backoff: float, max_group: int = 500):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_group = max_group
+        self._connection: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.commits = 0
+        self.writes = 0
+        self.retried = 0
+        self.dead = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    async def open(self) -> None:
+        self._connection = await asyncio.to_thread(self._connect)
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write())
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            # Commits what is still waiting before the connection is closed.
+            await self._queue.join()
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def _execute(self, operation: Operation) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _write(self) -> None:
+        while True:
+            group = [await self._queue.get()]
+            await asyncio.sleep(self.commit_interval)
+            while not self._queue.empty() and len(group) < self.max_group:
+                group.append(self._queue.get_nowait())
+            try:
+                results = await asyncio.to_thread(self._commit, [operation for operation, _ in group])
+                for (_, future), result in zip(group, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.error(f"Outbox commit failed. Reason: {repr(e)}")
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in group:
+                    self._queue.task_done()
+
+    def _commit(self, operations: List[Operation]) -> List[Any]:
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            results = [operation(connection) for operation in operations]
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self.commits += 1
+        self.writes += len(operations)
+        return results
+
+    def backoff_for(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    async def add(self, job_id: str, service_id: str, action_id: str, data: str) -> None:
+        now = time()
+        await self._execute(lambda c: c.execute(
+            "INSERT INTO outbox (id, service_id, action_id, data, attempts, next_at, created) "
+            "VALUES (?, ?, ?, ?, 0, ?, ?)",
+            (job_id, service_id, action_id, data, now, now)
+        ))
+
+    async def done(self, job_id: str) -> None:
+        await self._execute(lambda c: c.execute("DELETE FROM outbox WHERE id = ?", (job_id,)))
+
+    async def fail(self, job_id: str, attempts: int, error: str) -> Optional[float]:
+        """
+        Records a failed attempt. Returns the delay of the next attempt or None if the job was moved
+        to the dead letter table.
+        """
+        if attempts >= self.max_attempts:
+            await self._execute(lambda c: self._bury(c, job_id, attempts, error))
+            self.dead += 1
+            return None
+
+        delay = self.backoff_for(attempts)
+        await self._execute(lambda c: c.execute(
+            "UPDATE outbox SET attempts = ?, next_at = ?, error = ? WHERE id = ?",
+            (attempts, time() + delay, error, job_id)
+        ))
+        self.retried += 1
+        return delay
+
+    @staticmethod
+    def _bury(connection: sqlite3.Connection, job_id: str, attempts: int, error: str) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO dead_letter (id, service_id, action_id, data, attempts, created, failed, error) "
+            "SELECT id, service_id, action_id, data, ?, created, ?, ? FROM outbox WHERE id = ?",
+            (attempts, time(), error, job_id)
+        )
+        connection.execute("DELETE FROM outbox WHERE id = ?", (job_id,))
+
+    async def pending(self) -> List[Tuple[str, str, str, str, int, float]]:
+        """
+        Returns jobs that were not finished: id, service_id, action_id, data, attempts, next_at.
+        """
+        return await self._execute(lambda c: c.execute(
+            "SELECT id, service_id, action_id, data, attempts, next_at FROM outbox ORDER BY created"
+        ).fetchall())
+
+    async def stats(self) -> dict:
+        if self._connection is None:
+            return {"enabled": False}
+        pending, dead = await self._execute(lambda c: (
+            c.execute("SELECT COUNT(*) FROM outbox").fetchone()[0],
+            c.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        ))
+        return {
+            "enabled": True,
+            "pending": pending,
+            "dead_letter": dead,
+            "commits": self.commits,
+            "writes": self.writes,
+            "retried": self.retried,
+            "buried": self.dead
+        }
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from typing import Optional, Tuple, Type
+
+from tracardi.service.plugin.runner import ActionRunner
+
+from app.utils.ttl_cache import TtlCache
+
+
+def fingerprint(*values) -> str:
+    return hashlib.md5(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class PluginSetUpCache:
+    """
+    Keeps the attributes that plugin `set_up` creates (validated config, resource, clients) per workflow
+    node. Each entry stores a fingerprint of init and the node's microservice settings, any change
+    in the configuration or the resource replaces the entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TtlCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(plugin_type: Type[ActionRunner], node: dict) -> Tuple[str, Optional[str]]:
+        return f"{plugin_type.__module__}.{plugin_type.__name__}", node.get('id', None)
+
+    async def set_up(self, plugin: ActionRunner, init: dict, node: dict) -> None:
+        key = self.key(type(plugin), node)
+        config_print = fingerprint(init, node.get('microservice', None), node.get('on_connection_error_repeat', None))
+
+        if key[1] is not None:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == config_print:
+                self.hits += 1
+                plugin.__dict__.update(entry[1])
+                return
+
+        self.misses += 1
+        before = dict(vars(plugin))
+        await plugin.set_up(init)
+
+        if key[1] is not None:
+            self._cache.set(key, (config_print, {
+                name: value for name, value in vars(plugin).items()
+                if name not in before or before[name] is not value
+            }))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,68 @@
+import re
+from typing import Any, List, Tuple, Union
+
+from tracardi.service.notation.dot_accessor import DotAccessor
+
+# Strings that start with a data source, e.g. profile@traits.name, are read from the dot accessor.
+# Everything else is returned as it is, the same way DictTraverser does it.
+DOT_PATH = re.compile(r'^[a-zA-Z_]+@')
+
+_CONTAINER = 0
+_PATH = 1
+_CONSTANT = 2
+
+
+class ReshapePlan:
+    """
+    Reshape template compiled into a flat list of operations. Running the plan gives the same result
+    as DictTraverser(dot).reshape(template) without walking the template on every event.
+    """
+
+    def __init__(self, template: Union[dict, list, Any], default=None):
+        self.default = default
+        # Each operation is (parent index, key, kind, value). Containers are numbered in creation order.
+        self.operations: List[Tuple[int, Any, int, Any]] = []
+        self._containers = 0
+        self._compile(template, -1, None)
+
+    def _compile(self, value, parent: int, key) -> None:
+        if isinstance(value, dict):
+            index = self._add_container(parent, key, {})
+            for item_key, item in value.items():
+                self._compile(item, index, item_key)
+        elif isinstance(value, list):
+            index = self._add_container(parent, key, len(value))
+            for item_key, item in enumerate(value):
+                self._compile(item, index, item_key)
+        elif isinstance(value, str) and DOT_PATH.match(value):
+            self.operations.append((parent, key, _PATH, value))
+        else:
+            self.operations.append((parent, key, _CONSTANT, value))
+
+    def _add_container(self, parent: int, key, shape) -> int:
+        self.operations.append((parent, key, _CONTAINER, shape))
+        self._containers += 1
+        return self._containers - 1
+
+    def run(self, dot: DotAccessor):
+        containers = []
+        root = None
+        for parent, key, kind, value in self.operations:
+            if kind == _CONTAINER:
+                value = {} if isinstance(value, dict) else [None] * value
+                containers.append(value)
+            elif kind == _PATH:
+                try:
+                    value = dot[value]
+                except KeyError:
+                    value = self.default
+
+            if parent < 0:
+                root = value
+            else:
+                containers[parent][key] = value
+        return root
+
+
+def compile_reshape(template: Union[dict, list, Any], default=None) -> ReshapePlan:
+    return ReshapePlan(template, default)
@@ -0,0 +1,56 @@
+"""
+Per-request overhead of JWTBearer with the verified token cache off (AUTH_CACHE_TTL=0) and on (the default).
+
+    python -m load_test.bench_auth --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+from time import perf_counter
+
+os.environ.setdefault("API_KEY", "load-test-api-key-0123456789abcdef")
+os.environ.setdefault("SECRET", "load-test-secret-0123456789abcdef")
+
+from starlette.requests import Request  # noqa: E402
+
+from app.api.auth.auth_bearer import JWTBearer, sign_jwt, api_key_hash, verified_tokens  # noqa: E402
+from app.config import microservice  # noqa: E402
+
+
+def request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/plugin/run",
+        "headers": [(b"authorization", f"Bearer {token}".encode())]
+    })
+
+
+async def measure(bearer: JWTBearer, token: str, requests: int, ttl: float) -> float:
+    verified_tokens.clear()
+    verified_tokens.ttl = ttl
+    incoming = request(token)
+    start = perf_counter()
+    for _ in range(requests):
+        await bearer(incoming)
+    return (perf_counter() - start) / requests
+
+
+async def main(args: argparse.Namespace) -> None:
+    bearer = JWTBearer()
+    token = sign_jwt(api_key_hash(microservice.api_key))["access_token"]
+    default_ttl = verified_tokens.ttl or 300
+
+    await measure(bearer, token, min(1000, args.requests), default_ttl)  # warm up
+    off = await measure(bearer, token, args.requests, 0)
+    on = await measure(bearer, token, args.requests, default_ttl)
+
+    print(f"AUTH_CACHE_TTL=0    {off * 1e6:8.2f} us/request")
+    print(f"AUTH_CACHE_TTL={default_ttl:<4} {on * 1e6:8.2f} us/request  ({off / on:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of JWT verification with and without the cache.")
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""
+Throughput of Outbox.add and Outbox.done under concurrent submitters. Every submitter records a job and
+marks it done, as a durable background job does. Reports jobs per second, add latency and how many
+writes were grouped into one commit.
+
+    python -m load_test.bench_outbox --submitters 100 --jobs 20000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+from time import perf_counter
+
+os.environ.setdefault("API_KEY", "load-test-api-key-0123456789abcdef")
+
+from app.config import microservice  # noqa: E402
+from app.utils.outbox import Outbox  # noqa: E402
+from load_test.harness import percentile  # noqa: E402
+
+DATA = '{"context": {}, "params": {"payload": {"name": "Load test"}}, "init": {}}'
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(
+            path=os.path.join(directory, "outbox.db"),
+            commit_interval=args.commit_interval,
+            max_attempts=microservice.outbox_max_attempts,
+            backoff=microservice.outbox_backoff,
+            max_backoff=microservice.outbox_max_backoff
+        )
+        await outbox.open()
+        latencies = []
+        jobs = iter(range(args.jobs))
+
+        async def submitter():
+            for n in jobs:
+                job_id = f"job-{n}"
+                start = perf_counter()
+                await outbox.add(job_id, "service", "action", DATA)
+                latencies.append(perf_counter() - start)
+                await outbox.done(job_id)
+
+        try:
+            start = perf_counter()
+            await asyncio.gather(*[submitter() for _ in range(args.submitters)])
+            elapsed = perf_counter() - start
+            stats = await outbox.stats()
+        finally:
+            await outbox.close()
+
+    print(f"commit interval {args.commit_interval} s, {args.submitters} submitters, {args.jobs} jobs")
+    print(f"{args.jobs / elapsed:10.1f} jobs/s (add + done)")
+    print(f"add latency p50 {percentile(latencies, 50) * 1000:.2f} ms  p99 {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"{stats['commits']} commits, {stats['writes'] / max(1, stats['commits']):.1f} writes per commit, "
+          f"{stats['pending']} pending")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the durable job outbox.")
+    parser.add_argument("--submitters", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--commit-interval", type=float, default=microservice.outbox_commit_interval,
+                        help="Defaults to OUTBOX_COMMIT_INTERVAL.")
+    asyncio.run(main(parser.parse_args()))
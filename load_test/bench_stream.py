@@ -0,0 +1,107 @@
+"""
+Reading a large Trello list into the card index: the streamed read of the projected fields that
+TrelloClient does vs downloading every card and parsing the whole body with response.json().
+Reports time and peak Python memory of each read. The fake Trello runs in a separate process, so its
+memory is not counted.
+
+    python -m load_test.bench_stream --cards 50000 --desc-size 500
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tracemalloc
+from contextlib import aclosing
+from time import perf_counter
+from typing import Awaitable, Callable, Dict
+
+import aiohttp
+
+TRELLO_API_KEY = "load-test"
+TRELLO_TOKEN = "load-test-token"
+
+
+def start_fake(args: argparse.Namespace) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-u", "-m", "load_test.fake_trello", "--host", args.fake_host,
+         "--port", str(args.fake_port), "--lists", "1", "--members", "0", "--cards", str(args.cards),
+         "--desc-size", str(args.desc_size)],
+        stdout=subprocess.PIPE, text=True
+    )
+    for line in process.stdout:
+        if line.startswith("Fake Trello listens"):
+            return process
+    raise RuntimeError("Fake Trello did not start.")
+
+
+async def list_id(session: aiohttp.ClientSession, trello_url: str) -> str:
+    params = {"key": TRELLO_API_KEY, "token": TRELLO_TOKEN}
+    async with session.get(f"{trello_url}/members/me/boards", params=params) as response:
+        board_id = (await response.json())[0]["id"]
+    async with session.get(f"{trello_url}/boards/{board_id}/lists", params=params) as response:
+        return (await response.json())[0]["id"]
+
+
+async def measure(read: Callable[[], Awaitable[Dict[str, str]]], rounds: int) -> dict:
+    await read()  # warm up
+    elapsed = []
+    peaks = []
+    for _ in range(rounds):
+        tracemalloc.start()
+        start = perf_counter()
+        index = await read()
+        elapsed.append(perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "cards": len(index),
+        "ms": round(min(elapsed) * 1000, 1),
+        "peak_mb": round(max(peaks) / 2 ** 20, 2)
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    trello_url = f"http://{args.fake_host}:{args.fake_port}/1"
+    os.environ["TRELLO_API_URL"] = trello_url
+
+    from app.services.trello.session_pool import trello_session_pool
+    from app.services.trello.trello_client import TrelloClient, CARD_FIELDS
+
+    process = start_fake(args)
+    try:
+        client = TrelloClient(TRELLO_API_KEY, TRELLO_TOKEN)
+        session = trello_session_pool.session
+        source = await list_id(session, trello_url)
+
+        async def streamed() -> Dict[str, str]:
+            index = {}
+            async with aclosing(client._stream(f"/lists/{source}/cards", {"fields": CARD_FIELDS})) as stream:
+                async for card in stream:
+                    index[card["name"]] = card["id"]
+            return index
+
+        async def full() -> Dict[str, str]:
+            async with session.get(f"{trello_url}/lists/{source}/cards",
+                                   params={"key": TRELLO_API_KEY, "token": TRELLO_TOKEN}) as response:
+                cards = await response.json()
+            return {card["name"]: card["id"] for card in cards}
+
+        for name, read in [("full response.json()", full), ("streamed, projected", streamed)]:
+            result = await measure(read, args.rounds)
+            print(f"{name:<22} {result['cards']:>8} cards  {result['ms']:>9} ms  peak {result['peak_mb']:>8} MB")
+    finally:
+        await trello_session_pool.close()
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the streamed card list read.")
+    parser.add_argument("--fake-host", default="127.0.0.1")
+    parser.add_argument("--fake-port", type=int, default=8101)
+    parser.add_argument("--cards", type=int, default=50000)
+    parser.add_argument("--desc-size", type=int, default=500, help="Length of the card descriptions.")
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,481 @@
+"""
+In-process stand-in for the Trello REST API. It covers the routes used by TrelloClient: boards, lists,
+cards, members, webhooks and /batch. Latency, 5xx errors and 429 responses can be injected. Card changes
+are sent to registered webhooks, signed with the webhook secret.
+
+Run it on its own:
+
+    python -m load_test.fake_trello --port 8100 --boards 1 --lists 4 --cards 20000
+
+and start the microservice with TRELLO_API_URL=http://localhost:8100/1
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+from collections import Counter, OrderedDict, deque
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from uuid import uuid4
+
+import aiohttp
+from aiohttp import web
+
+
+def trello_id() -> str:
+    return uuid4().hex[:24]
+
+
+class Latency:
+    """
+    Latency distribution given as a string:
+
+    0                       no latency
+    fixed:0.02              always 20ms
+    uniform:0.01:0.05       between 10 and 50ms
+    normal:0.03:0.01        mean 30ms, deviation 10ms
+    lognormal:-3.5:0.5      log-normal with mu and sigma of the underlying normal distribution
+    exp:0.03                exponential with mean 30ms
+    """
+
+    def __init__(self, spec: str = "0"):
+        self.spec = spec
+        name, *args = spec.split(":")
+        values = [float(arg) for arg in args]
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: random.uniform(values[0], values[1]),
+            "normal": lambda: random.gauss(values[0], values[1]),
+            "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+            "exp": lambda: random.expovariate(1 / values[0])
+        }
+        if name in samplers:
+            self._sample = samplers[name]
+        elif name == "0":
+            self._sample = lambda: 0.
+        else:
+            raise ValueError(f"Unknown latency distribution {spec}.")
+
+    def sample(self) -> float:
+        return max(0., self._sample())
+
+
+class Faults:
+    """
+    Injected failures. `error_rate` and `throttle_rate` are probabilities of a 500 and a 429 response.
+    `quota` limits requests per token in a `quota_window` like Trello does (100 per 10 seconds),
+    0 disables it.
+    """
+
+    def __init__(self, latency: Latency = None, error_rate: float = 0., throttle_rate: float = 0.,
+                 quota: int = 0, quota_window: float = 10.):
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.quota = quota
+        self.quota_window = quota_window
+        self._requests: Dict[str, deque] = {}
+
+    def over_quota(self, token: str) -> bool:
+        if self.quota <= 0:
+            return False
+        now = monotonic()
+        requests = self._requests.setdefault(token, deque())
+        while requests and requests[0] <= now - self.quota_window:
+            requests.popleft()
+        if len(requests) >= self.quota:
+            return True
+        requests.append(now)
+        return False
+
+
+class FakeTrello:
+
+    def __init__(self, faults: Faults = None, webhook_secret: str = ""):
+        self.faults = faults or Faults()
+        self.webhook_secret = webhook_secret
+        self.webhooks: Dict[str, dict] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._notifications = set()
+        self.boards: Dict[str, dict] = {}
+        self.lists: Dict[str, dict] = {}
+        self.cards: Dict[str, dict] = {}
+        self.members: Dict[str, dict] = {}
+        self.emails: Dict[str, str] = {}
+        self.requests = Counter()
+        self.responses = Counter()
+        self._routes: List[Tuple[str, re.Pattern, Callable]] = [
+            ("GET", re.compile(r"^/members/me/boards$"), self._get_boards),
+            ("GET", re.compile(r"^/boards/(?P<board_id>\w+)/lists$"), self._get_lists),
+            ("GET", re.compile(r"^/boards/(?P<board_id>\w+)/members$"), self._get_board_members),
+            ("GET", re.compile(r"^/lists/(?P<list_id>\w+)/cards$"), self._get_cards),
+            ("GET", re.compile(r"^/search/members$"), self._search_members),
+            ("GET", re.compile(r"^/cards/(?P<card_id>\w+)$"), self._get_card),
+            ("POST", re.compile(r"^/cards$"), self._add_card),
+            ("PUT", re.compile(r"^/cards/(?P<card_id>\w+)$"), self._update_card),
+            ("DELETE", re.compile(r"^/cards/(?P<card_id>\w+)$"), self._delete_card),
+            ("PUT", re.compile(r"^/cards/(?P<card_id>\w+)/idMembers$"), self._add_card_member),
+            ("POST", re.compile(r"^/cards/(?P<card_id>\w+)/idMembers$"), self._add_card_member),
+            ("GET", re.compile(r"^/tokens/(?P<token>[^/]+)/webhooks$"), self._get_webhooks),
+            ("DELETE", re.compile(r"^/webhooks/(?P<webhook_id>\w+)$"), self._delete_webhook),
+        ]
+
+    # Data
+
+    def add_board(self, name: str, url: Optional[str] = None) -> dict:
+        board_id = trello_id()
+        board = self.boards[board_id] = {
+            "id": board_id,
+            "name": name,
+            "url": url or f"https://trello.com/b/{board_id[:8]}/{name.lower().replace(' ', '-')}",
+            "idLists": [],
+            "idMembers": []
+        }
+        return board
+
+    def add_list(self, board_id: str, name: str) -> dict:
+        list_id = trello_id()
+        trello_list = self.lists[list_id] = {"id": list_id, "name": name, "idBoard": board_id, "cards": OrderedDict()}
+        self.boards[board_id]["idLists"].append(list_id)
+        return trello_list
+
+    def add_member(self, board_id: str, username: str, full_name: str = "") -> dict:
+        member_id = trello_id()
+        member = self.members[member_id] = {"id": member_id, "username": username, "fullName": full_name or username}
+        self.boards[board_id]["idMembers"].append(member_id)
+        # Like Trello, emails are not returned with the board members, only by member search.
+        self.emails[f"{username}@example.com"] = member_id
+        return member
+
+    def new_card(self, list_id: str, name: str, **fields) -> dict:
+        trello_list = self.lists[list_id]
+        card_id = trello_id()
+        card = self.cards[card_id] = {
+            "id": card_id,
+            "name": name,
+            "idList": list_id,
+            "idBoard": trello_list["idBoard"],
+            "idMembers": [],
+            "desc": "",
+            "closed": False,
+            **fields
+        }
+        trello_list["cards"][card_id] = card
+        return card
+
+    def seed(self, boards: int = 1, lists: int = 4, cards: int = 1000, members: int = 10,
+             desc_size: int = 0) -> List[dict]:
+        """
+        Creates synthetic boards. Cards are spread over the lists, named "Card <n>" and unique per board.
+        Each card gets a description of `desc_size` characters.
+        """
+        created = []
+        for b in range(boards):
+            board = self.add_board(f"Board {b}")
+            list_ids = [self.add_list(board["id"], f"List {n}")["id"] for n in range(lists)]
+            for n in range(members):
+                self.add_member(board["id"], f"member{n}", f"Member {n}")
+            for n in range(cards):
+                self.new_card(list_ids[n % len(list_ids)], f"Card {n}", desc="x" * desc_size)
+            created.append(board)
+        return created
+
+    # Routes
+
+    @staticmethod
+    def _fields(item: dict, fields: Optional[str]) -> dict:
+        if not fields or fields == "all":
+            return {key: value for key, value in item.items() if key != "cards"}
+        return {key: item[key] for key in ["id", *fields.split(",")] if key in item}
+
+    def _get_boards(self, query, data):
+        return 200, [self._fields(board, query.get("fields")) for board in self.boards.values()]
+
+    def _get_lists(self, query, data, board_id):
+        board = self.boards.get(board_id)
+        if board is None:
+            return 404, "The requested resource was not found."
+        return 200, [self._fields(self.lists[list_id], query.get("fields")) for list_id in board["idLists"]]
+
+    def _get_board_members(self, query, data, board_id):
+        board = self.boards.get(board_id)
+        if board is None:
+            return 404, "The requested resource was not found."
+        return 200, [self.members[member_id] for member_id in board["idMembers"]]
+
+    def _search_members(self, query, data):
+        # Like Trello the search is fuzzy: members whose username starts with the part before @ are found too.
+        text = query.get("query", "").lower()
+        board = self.boards.get(query.get("idBoard", None), None)
+        found = []
+        for email, member_id in self.emails.items():
+            if board is not None and member_id not in board["idMembers"]:
+                continue
+            if email == text or self.members[member_id]["username"].startswith(text.split("@")[0]):
+                found.append({**self.members[member_id], "email": email})
+        found.sort(key=lambda member: member["email"] != text)
+        return 200, found[:int(query.get("limit", 8))]
+
+    def _get_cards(self, query, data, list_id):
+        trello_list = self.lists.get(list_id)
+        if trello_list is None:
+            return 404, "The requested resource was not found."
+        return 200, [self._fields(card, query.get("fields")) for card in trello_list["cards"].values()]
+
+    def _get_card(self, query, data, card_id):
+        card = self.cards.get(card_id)
+        if card is None:
+            return 404, "The requested resource was not found."
+        return 200, self._fields(card, query.get("fields"))
+
+    def _add_card(self, query, data):
+        list_id = query.get("idList") or data.get("idList")
+        if list_id not in self.lists:
+            return 400, "invalid value for idList"
+        fields = {key: value for key, value in data.items() if key not in ("name", "idList")}
+        card = self.new_card(list_id, data.get("name", ""), **fields)
+        self._emit("createCard", card, {"list": self._ref(list_id)})
+        return 200, card
+
+    def _update_card(self, query, data, card_id):
+        card = self.cards.get(card_id)
+        if card is None:
+            return 404, "The requested resource was not found."
+        if "closed" in data:
+            data = {**data, "closed": str(data["closed"]).lower() == "true"}
+        list_id = data.get("idList", card["idList"])
+        if list_id not in self.lists:
+            return 400, "invalid value for idList"
+        old = {key: card[key] for key in ("name", "idList", "closed") if key in data and card.get(key) != data[key]}
+        if list_id != card["idList"]:
+            del self.lists[card["idList"]]["cards"][card_id]
+            self.lists[list_id]["cards"][card_id] = card
+        card.update({key: value for key, value in data.items()})
+        card["idBoard"] = self.lists[list_id]["idBoard"]
+        if old:
+            extra = {"old": old, "list": self._ref(list_id)}
+            if "idList" in old:
+                extra.update({"listBefore": self._ref(old["idList"]), "listAfter": self._ref(list_id)})
+            self._emit("updateCard", card, extra)
+        return 200, card
+
+    def _delete_card(self, query, data, card_id):
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return 404, "The requested resource was not found."
+        del self.lists[card["idList"]]["cards"][card_id]
+        self._emit("deleteCard", {"id": card_id, "idBoard": card["idBoard"]}, {"list": self._ref(card["idList"])})
+        return 200, {"limits": {}}
+
+    def _add_card_member(self, query, data, card_id):
+        card = self.cards.get(card_id)
+        if card is None:
+            return 404, "The requested resource was not found."
+        member_id = data.get("value") or query.get("value")
+        if member_id not in self.members:
+            return 400, "invalid value for value"
+        if member_id in card["idMembers"]:
+            return 400, "member is already on the card"
+        card["idMembers"].append(member_id)
+        return 200, [self.members[member_id] for member_id in card["idMembers"]]
+
+    # Webhooks
+
+    def _get_webhooks(self, query, data, token):
+        return 200, [webhook for webhook in self.webhooks.values() if webhook["token"] == token]
+
+    def _delete_webhook(self, query, data, webhook_id):
+        if self.webhooks.pop(webhook_id, None) is None:
+            return 404, "The requested resource was not found."
+        return 200, {}
+
+    async def _add_webhook(self, token: str, data: dict) -> Tuple[int, object]:
+        callback_url = data.get("callbackURL", "")
+        if data.get("idModel", None) not in self.boards:
+            return 400, "invalid value for idModel"
+        # Like Trello, the callback must answer HEAD with 200.
+        try:
+            async with self.session.head(callback_url) as response:
+                if response.status != 200:
+                    return 400, f"URL ({callback_url}) did not return 200 status code, got {response.status}"
+        except aiohttp.ClientError:
+            return 400, f"URL ({callback_url}) could not be reached"
+        webhook_id = trello_id()
+        webhook = self.webhooks[webhook_id] = {
+            "id": webhook_id,
+            "description": data.get("description", ""),
+            "idModel": data["idModel"],
+            "callbackURL": callback_url,
+            "active": True,
+            "token": token
+        }
+        return 200, {key: value for key, value in webhook.items() if key != "token"}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def _ref(self, list_id: str) -> dict:
+        return {"id": list_id, "name": self.lists[list_id]["name"]}
+
+    def _emit(self, action_type: str, card: dict, extra: dict) -> None:
+        board_id = card["idBoard"]
+        webhooks = [webhook for webhook in self.webhooks.values() if webhook["idModel"] == board_id]
+        if not webhooks:
+            return
+        action = {
+            "id": trello_id(),
+            "type": action_type,
+            "data": {
+                "card": {key: card[key] for key in ("id", "name", "idList", "closed") if key in card},
+                "board": {"id": board_id, "name": self.boards[board_id]["name"]},
+                **extra
+            }
+        }
+        for webhook in webhooks:
+            task = asyncio.ensure_future(self._notify(webhook, action))
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+
+    async def _notify(self, webhook: dict, action: dict) -> None:
+        body = json.dumps({"action": action, "model": {"id": webhook["idModel"]}}).encode()
+        digest = hmac.new(self.webhook_secret.encode(), body + webhook["callbackURL"].encode(), hashlib.sha1).digest()
+        try:
+            async with self.session.post(webhook["callbackURL"], data=body, headers={
+                "Content-Type": "application/json",
+                "X-Trello-Webhook": base64.b64encode(digest).decode()
+            }) as response:
+                self.requests[f"webhook {response.status}"] += 1
+        except aiohttp.ClientError:
+            self.requests["webhook error"] += 1
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._notifications, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def dispatch(self, method: str, path: str, query: dict, data: dict) -> Tuple[int, object]:
+        for route_method, pattern, handler in self._routes:
+            if route_method == method:
+                match = pattern.match(path)
+                if match:
+                    return handler(query, data, **match.groupdict())
+        return 404, "Cannot {} {}".format(method, path)
+
+    def _batch(self, query: dict) -> Tuple[int, object]:
+        urls = [url for url in query.get("urls", "").split(",") if url]
+        if len(urls) > 10:
+            return 400, "Batch is limited to 10 routes."
+        results = []
+        for url in urls:
+            path, _, query_string = url.partition("?")
+            route_query = dict(parse_qsl(query_string))
+            status, body = self.dispatch("GET", path, route_query, {})
+            results.append({str(status): body})
+        return 200, results
+
+    # Server
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = "/" + request.match_info["path"]
+        self.requests[f"{request.method} {re.sub(r'[0-9a-f]{24}', '{id}', path)}"] += 1
+
+        await asyncio.sleep(self.faults.latency.sample())
+
+        query = dict(request.query)
+        token = query.pop("token", None)
+        query.pop("key", None)
+        if not token:
+            return self._respond(401, "invalid token")
+        if self.faults.over_quota(token) or random.random() < self.faults.throttle_rate:
+            return self._respond(429, {"error": "API_TOKEN_LIMIT_EXCEEDED"}, headers={"Retry-After": "1"})
+        if random.random() < self.faults.error_rate:
+            return self._respond(500, "Internal server error")
+
+        data = dict(await request.post()) if request.can_read_body else {}
+        if request.method == "GET" and path == "/batch":
+            status, body = self._batch(query)
+        elif request.method == "POST" and path == "/webhooks":
+            status, body = await self._add_webhook(token, {**query, **data})
+        else:
+            status, body = self.dispatch(request.method, path, query, data)
+        return self._respond(status, body)
+
+    def _respond(self, status: int, body, headers: Optional[dict] = None) -> web.Response:
+        self.responses[status] += 1
+        if isinstance(body, str):
+            return web.Response(status=status, text=body, headers=headers)
+        return web.Response(status=status, text=json.dumps(body), content_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self.boards),
+            "lists": len(self.lists),
+            "cards": len(self.cards),
+            "requests": dict(self.requests),
+            "responses": dict(self.responses)
+        }
+
+    def application(self) -> web.Application:
+        application = web.Application()
+        application.router.add_route("*", "/1/{path:.*}", self._handle)
+        application.on_cleanup.append(lambda _: self.close())
+        return application
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8100) -> web.AppRunner:
+        runner = web.AppRunner(self.application(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="0", help="Latency distribution, e.g. lognormal:-3.5:0.5")
+    parser.add_argument("--error-rate", type=float, default=0., help="Probability of a 500 response.")
+    parser.add_argument("--throttle-rate", type=float, default=0., help="Probability of a 429 response.")
+    parser.add_argument("--quota", type=int, default=0, help="Requests per token in 10 seconds, 0 is unlimited.")
+    parser.add_argument("--boards", type=int, default=1)
+    parser.add_argument("--lists", type=int, default=4)
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--desc-size", type=int, default=0, help="Length of the card descriptions.")
+    parser.add_argument("--webhook-secret", default="", help="Secret that signs webhook calls, "
+                                                             "the microservice needs it as TRELLO_WEBHOOK_SECRET.")
+
+
+def create_fake_trello(args: argparse.Namespace) -> FakeTrello:
+    fake = FakeTrello(Faults(
+        latency=Latency(args.latency),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        quota=args.quota
+    ), webhook_secret=args.webhook_secret)
+    fake.seed(boards=args.boards, lists=args.lists, cards=args.cards, members=args.members,
+              desc_size=args.desc_size)
+    return fake
+
+
+async def serve(args: argparse.Namespace) -> None:
+    fake = create_fake_trello(args)
+    await fake.start(args.host, args.port)
+    for board in fake.boards.values():
+        print(f"Board {board['name']}: {board['url']}")
+    print(f"Fake Trello listens on http://{args.host}:{args.port}/1")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Trello API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_fault_arguments(parser)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,244 @@
+"""
+Load test of the Trello actions. Starts the fake Trello API in this process, drives /plugin/run for each
+Trello action and reports throughput and latency percentiles.
+
+By default the microservice is started in this process too, pointed at the fake Trello:
+
+    python -m load_test.harness --requests 2000 --concurrency 50 --latency lognormal:-3.5:0.5
+
+To test a microservice running elsewhere start it with TRELLO_API_URL=http://<this host>:8100/1 and pass
+its url and API key:
+
+    python -m load_test.harness --service-url http://localhost:20000 --api-key <API_KEY>
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from collections import Counter
+from time import monotonic
+from typing import Callable, List, Optional
+
+import aiohttp
+
+from load_test.fake_trello import FakeTrello, add_fault_arguments, create_fake_trello
+
+TRELLO_SERVICE_ID = "a307b281-2629-4c12-b6e3-df1ec9bca35a"
+TRELLO_API_KEY = "load-test"
+ACTIONS = {
+    "add": "a04381af-c008-4328-ab61-0e73825903ce",
+    "move": "9062083f-6bb5-4208-ae31-c2562161ab9b",
+    "add_member": "0c52a414-8fc6-40ff-b3c7-27183285c753",
+    "delete": "b5a5ad32-95a8-4a50-bd36-d29f3e98c523"
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def node(action: str, api_key: str, token: str) -> dict:
+    # The node as Tracardi sends it to the microservice. One node per action, as in a workflow.
+    return {
+        "id": f"load-test-{action}",
+        "name": f"Load test {action}",
+        "on_connection_error_repeat": 1,
+        "microservice": {
+            "server": {
+                "credentials": {"production": {"url": "", "token": ""}, "test": {"url": "", "token": ""}},
+                "resource": {"id": "", "name": ""}
+            },
+            "service": {"id": TRELLO_SERVICE_ID, "name": "Trello"},
+            "plugin": {"id": ACTIONS[action], "name": action, "resource": {"api_key": api_key, "token": token}}
+        }
+    }
+
+
+class Scenario:
+    """
+    Builds the init and payload of every request. Cards are moved from "List 0" to "List 1", get a member
+    there and are deleted from "List 1", so each action works on cards that exist.
+    """
+
+    def __init__(self, fake: FakeTrello):
+        self.board = next(iter(fake.boards.values()))
+        self.lists = {fake.lists[list_id]["name"]: list_id for list_id in self.board["idLists"]}
+        self.source = [card["name"] for card in fake.lists[self.lists["List 0"]]["cards"].values()]
+        self.member = fake.members[self.board["idMembers"][0]]["id"] if self.board["idMembers"] else ""
+
+    def init(self, action: str) -> dict:
+        board_url = self.board["url"]
+        if action == "add":
+            return {"board_url": board_url, "list_name": "List 2", "list_id": self.lists["List 2"], "card": {
+                "name": "payload@name",
+                "desc": "Added by load test for {{payload@name}}",
+                "urlSource": "payload@url",
+                "coordinates": "payload@coordinates",
+                "due": "payload@due"
+            }}
+        if action == "move":
+            return {"board_url": board_url, "list_name1": "List 0", "list_id1": self.lists["List 0"],
+                    "list_name2": "List 1", "list_id2": self.lists["List 1"], "card_name": "payload@name"}
+        if action == "add_member":
+            return {"board_url": board_url, "list_name": "List 1", "list_id": self.lists["List 1"],
+                    "card_name": "payload@name", "member_id": "payload@member"}
+        return {"board_url": board_url, "list_name": "List 1", "list_id": self.lists["List 1"],
+                "card_name": "payload@name"}
+
+    def payload(self, action: str, n: int) -> dict:
+        if action == "add":
+            return {"name": f"Load test {n}", "url": "https://example.com", "coordinates": "52.2,21.0",
+                    "due": "2030-01-01T00:00:00"}
+        return {"name": self.source[n % len(self.source)], "member": self.member}
+
+
+async def run_action(session: aiohttp.ClientSession, service_url: str, headers: dict, action: str,
+                     scenario: Scenario, trello_key: str, trello_token: str, requests: int,
+                     concurrency: int) -> dict:
+    latencies = []
+    statuses = Counter()
+    ports = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    context = {"node": node(action, trello_key, trello_token)}
+    init = scenario.init(action)
+
+    async def _request(n: int):
+        body = {"context": context, "params": {"payload": scenario.payload(action, n)}, "init": init}
+        async with semaphore:
+            start = monotonic()
+            async with session.post(f"{service_url}/plugin/run",
+                                    params={"service_id": TRELLO_SERVICE_ID, "action_id": ACTIONS[action]},
+                                    json=body, headers=headers) as response:
+                result = await response.json(content_type=None)
+            latencies.append(monotonic() - start)
+        statuses[response.status] += 1
+        if isinstance(result, dict) and isinstance(result.get("result", None), dict):
+            ports[result["result"].get("port", None)] += 1
+
+    start = monotonic()
+    await asyncio.gather(*[_request(n) for n in range(requests)])
+    elapsed = monotonic() - start
+
+    return {
+        "action": action,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 1) if elapsed else 0.,
+        "p50": round(percentile(latencies, 50) * 1000, 1),
+        "p95": round(percentile(latencies, 95) * 1000, 1),
+        "p99": round(percentile(latencies, 99) * 1000, 1),
+        "statuses": dict(statuses),
+        "ports": dict(ports)
+    }
+
+
+async def start_service(host: str, port: int, trello_url: str, webhook_secret: str, rate_limit: float) -> Callable:
+    """
+    Starts the microservice in this process and returns a coroutine function that stops it.
+    """
+    os.environ["TRELLO_API_URL"] = trello_url
+    # All requests use one token, so the default limit of 8 requests per second would cap the throughput.
+    os.environ["TRELLO_RATE_LIMIT"] = str(rate_limit)
+    if webhook_secret:
+        os.environ["TRELLO_WEBHOOK_SECRET"] = webhook_secret
+        os.environ["TRELLO_WEBHOOK_CALLBACK_URL"] = f"http://{host}:{port}/trello/webhook"
+    os.environ.setdefault("API_KEY", "load-test-api-key-0123456789abcdef")
+    os.environ.setdefault("SECRET", "load-test-secret-0123456789abcdef")
+
+    import uvicorn
+    from app.server import application
+
+    server = uvicorn.Server(uvicorn.Config(application, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+
+    async def stop():
+        server.should_exit = True
+        await task
+
+    return stop
+
+
+async def main(args: argparse.Namespace) -> None:
+    fake = create_fake_trello(args)
+    if args.cards < args.lists:
+        raise ValueError("There must be at least one card per list.")
+    runner = await fake.start(args.fake_host, args.fake_port)
+    trello_url = f"http://{args.fake_host}:{args.fake_port}/1"
+
+    stop_service: Optional[Callable] = None
+    service_url = args.service_url
+    api_key = args.api_key
+    if service_url is not None and api_key is None:
+        raise ValueError("--api-key is required with --service-url.")
+    if service_url is None:
+        stop_service = await start_service(args.service_host, args.service_port, trello_url, args.webhook_secret,
+                                           args.rate_limit)
+        service_url = f"http://{args.service_host}:{args.service_port}"
+        api_key = os.environ["API_KEY"]
+
+    scenario = Scenario(fake)
+    report = []
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+            async with session.get(f"{service_url}/api-key/{api_key}") as response:
+                response.raise_for_status()
+                headers = {"Authorization": f"Bearer {(await response.json())['access_token']}"}
+
+            if args.webhook_secret:
+                # Every card change in the fake Trello is then sent to the webhook receiver of the service.
+                async with session.post(f"{service_url}/trello/webhook/register", headers=headers, json={
+                    "credentials": {"api_key": TRELLO_API_KEY, "token": args.trello_token},
+                    "board_url": scenario.board["url"]
+                }) as response:
+                    response.raise_for_status()
+                    print(f"Webhook {(await response.json())['id']} registered.")
+
+            for action in args.actions.split(","):
+                result = await run_action(session, service_url, headers, action, scenario, TRELLO_API_KEY,
+                                          args.trello_token, args.requests, args.concurrency)
+                report.append(result)
+                print(f"{action:<12} {result['throughput']:>9} req/s  p50 {result['p50']:>8} ms  "
+                      f"p95 {result['p95']:>8} ms  p99 {result['p99']:>8} ms  "
+                      f"statuses {result['statuses']}  ports {result['ports']}")
+
+            async with session.get(f"{service_url}/stats", headers=headers) as response:
+                service_stats = await response.json() if response.status == 200 else None
+    finally:
+        if stop_service is not None:
+            await stop_service()
+        await runner.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"results": report, "trello": fake.stats(), "service": service_stats}, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the Trello actions against a fake Trello API.")
+    parser.add_argument("--service-url", default=None, help="Url of a running microservice. "
+                                                            "If not set the microservice is started in-process.")
+    parser.add_argument("--api-key", default=None, help="API key of the running microservice.")
+    parser.add_argument("--service-host", default="127.0.0.1")
+    parser.add_argument("--service-port", type=int, default=20001)
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="TRELLO_RATE_LIMIT of the in-process microservice. 0, the default, turns the limit "
+                             "off, use --quota to make the fake Trello throttle.")
+    parser.add_argument("--fake-host", default="127.0.0.1")
+    parser.add_argument("--fake-port", type=int, default=8100)
+    parser.add_argument("--trello-token", default="load-test-token", help="Token sent to the fake Trello. "
+                                                                          "Rate limits are per token.")
+    parser.add_argument("--actions", default=",".join(ACTIONS), help="Comma separated actions to run in order.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per action.")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", default=None, help="Writes the full report as JSON to this file.")
+    add_fault_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
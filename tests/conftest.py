@@ -0,0 +1,6 @@
+import os
+
+# app.config reads the environment on import.
+os.environ.setdefault("API_KEY", "test-api-key-0123456789abcdef0123456789")
+os.environ.setdefault("SECRET", "test-secret-0123456789abcdef0123456789")
+os.environ.setdefault("TRELLO_RATE_LIMIT", "0")
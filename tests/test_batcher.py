@@ -0,0 +1,167 @@
+import asyncio
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.services.trello import trello_client
+from app.services.trello.batcher import TrelloBatcher
+from app.services.trello.errors import TrelloResponseError
+from app.services.trello.session_pool import trello_session_pool
+from app.services.trello.trello_client import TrelloClient
+from load_test.fake_trello import FakeTrello
+
+
+class StubClient:
+    """
+    Stands in for TrelloClient. Answers GET /batch like Trello does, every route with its own result.
+    """
+
+    credentials = "credentials"
+
+    def __init__(self, batch_results=None, error=None):
+        self.calls = []
+        self.batch_results = batch_results
+        self.error = error
+
+    @staticmethod
+    def result(route: str) -> dict:
+        if route.startswith("/missing"):
+            return {"404": "The requested resource was not found."}
+        if route.startswith("/limited"):
+            return {"name": "RateLimitError", "message": "Too many requests", "statusCode": 429}
+        url = urlparse(route)
+        return {"200": {"path": url.path, "query": {key: value[0] for key, value in parse_qs(url.query).items()}}}
+
+    async def _send(self, method, path, params=None):
+        self.calls.append((path, params))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        if path != "/batch":
+            return {"path": path, "query": params or {}}
+        routes = params["urls"].split(",")
+        if self.batch_results is not None:
+            return self.batch_results(routes)
+        return [self.result(route) for route in routes]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_single_request_is_sent_directly():
+    async def main():
+        client = StubClient()
+        result = await TrelloBatcher(window=0.001).get(client, "/boards/1/lists", {"fields": "name"})
+        return client, result
+
+    client, result = run(main())
+    assert client.calls == [("/boards/1/lists", {"fields": "name"})]
+    assert result == {"path": "/boards/1/lists", "query": {"fields": "name"}}
+
+
+def test_requests_are_split_into_batches_of_max_size():
+    async def main():
+        client = StubClient()
+        batcher = TrelloBatcher(window=0.01, max_size=10)
+        results = await asyncio.gather(*[batcher.get(client, f"/lists/{n}/cards", {"fields": "id,name"})
+                                         for n in range(25)])
+        return client, batcher, results
+
+    client, batcher, results = run(main())
+    assert [len(params["urls"].split(",")) for path, params in client.calls] == [10, 10, 5]
+    assert all(path == "/batch" for path, _ in client.calls)
+    # Every caller gets the result of its own route, commas in query values are escaped.
+    assert results == [{"path": f"/lists/{n}/cards", "query": {"fields": "id,name"}} for n in range(25)]
+    assert batcher.stats() == {"window": 0.01, "requests": 25, "batches": 3}
+
+
+def test_errors_go_to_their_callers_only():
+    async def main():
+        client = StubClient()
+        batcher = TrelloBatcher(window=0.01)
+        return await asyncio.gather(batcher.get(client, "/boards/1"), batcher.get(client, "/missing/1"),
+                                    batcher.get(client, "/limited/1"), return_exceptions=True)
+
+    found, missing, limited = run(main())
+    assert found == {"path": "/boards/1", "query": {}}
+    assert isinstance(missing, TrelloResponseError) and missing.status == 404
+    assert isinstance(limited, TrelloResponseError) and limited.status == 429
+
+
+def test_missing_batch_result():
+    async def main():
+        client = StubClient(batch_results=lambda routes: [StubClient.result(routes[0])])
+        batcher = TrelloBatcher(window=0.01)
+        return await asyncio.gather(batcher.get(client, "/boards/1"), batcher.get(client, "/boards/2"),
+                                    return_exceptions=True)
+
+    first, second = run(main())
+    assert first == {"path": "/boards/1", "query": {}}
+    assert isinstance(second, ConnectionError)
+    assert "missing a result" in str(second)
+
+
+def test_failed_batch_fails_every_caller():
+    async def main():
+        client = StubClient(error=ConnectionError("Could not connect to Trello."))
+        batcher = TrelloBatcher(window=0.01)
+        return await asyncio.gather(batcher.get(client, "/boards/1"), batcher.get(client, "/boards/2"),
+                                    return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_cancelled_caller_is_not_sent():
+    async def main():
+        client = StubClient()
+        batcher = TrelloBatcher(window=0.01)
+        cancelled = asyncio.ensure_future(batcher.get(client, "/boards/1"))
+        kept = asyncio.ensure_future(batcher.get(client, "/boards/2"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return client, await kept
+
+    client, result = run(main())
+    # Only one request is left, so it goes out on its own.
+    assert client.calls == [("/boards/2", None)]
+    assert result == {"path": "/boards/2", "query": {}}
+
+
+def test_batched_lookups_through_trello_client(monkeypatch):
+    fake = FakeTrello()
+    first, second = fake.seed(boards=2, lists=3, cards=0, members=1)
+    batcher = TrelloBatcher(window=0.05)
+    monkeypatch.setattr(trello_client, "trello_batcher", batcher)
+
+    async def main():
+        runner = await fake.start("127.0.0.1", 0)
+        host = f"127.0.0.1:{runner.addresses[0][1]}"
+        monkeypatch.setattr(trello_client, "TRELLO_API_URL", f"http://{host}/1")
+        monkeypatch.setattr(trello_client, "TRELLO_HOST", host)
+        try:
+            client = TrelloClient("key", "batch-token")
+            return await asyncio.gather(
+                client._get(f"/boards/{first['id']}/lists", {"fields": "id,name"}),
+                client._get(f"/boards/{second['id']}/lists", {"fields": "id,name"}),
+                client._get(f"/boards/{first['id']}/members"),
+                client._get("/boards/missing/lists"),
+                return_exceptions=True
+            )
+        finally:
+            await trello_session_pool.close()
+            await runner.cleanup()
+
+    first_lists, second_lists, members, missing = asyncio.run(main())
+
+    # One /batch request with key and token, the fake answers 401 without a token.
+    assert fake.requests == {"GET /batch": 1}
+    assert batcher.stats()["batches"] == 1
+    # Each caller gets its own result. Commas of the fields parameter did not split the routes.
+    assert first_lists == [{"id": list_id, "name": fake.lists[list_id]["name"]} for list_id in first["idLists"]]
+    assert second_lists == [{"id": list_id, "name": fake.lists[list_id]["name"]} for list_id in second["idLists"]]
+    assert [member["id"] for member in members] == first["idMembers"]
+    assert isinstance(missing, TrelloResponseError) and missing.status == 404
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+
+import aiohttp
+import uvicorn
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+
+from app.api import trello_endpoint
+from app.api.auth.auth_bearer import sign_jwt, api_key_hash
+from app.config import microservice
+
+REQUEST = {
+    "credentials": {"api_key": "key", "token": "token"},
+    "board_url": "https://trello.com/b/board/board",
+    "list_name": "List 0",
+    "items": [{"card_name": "Card 0"}, {"card_name": "Card 1"}]
+}
+
+
+class SlowBulk:
+    """
+    Stands in for TrelloBulk. The last item is done only after the first line was read or after 5 seconds.
+    """
+
+    read: asyncio.Event
+    finished: asyncio.Event
+
+    def __init__(self, operation, request, concurrency):
+        self.request = request
+
+    async def resolve(self):
+        pass
+
+    async def run(self):
+        yield {"index": 0, "status": 200, "response": {"id": "card-0"}}
+        try:
+            await asyncio.wait_for(self.read.wait(), 5)
+        except asyncio.TimeoutError:
+            pass
+        self.finished.set()
+        yield {"index": 1, "status": 200, "response": {"id": "card-1"}}
+
+
+def test_results_stream_through_gzip_middleware(monkeypatch):
+    monkeypatch.setattr(trello_endpoint, "TrelloBulk", SlowBulk)
+    application = FastAPI()
+    application.add_middleware(GZipMiddleware, minimum_size=10)
+    application.include_router(trello_endpoint.router)
+    token = sign_jwt(api_key_hash(microservice.api_key))["access_token"]
+
+    async def main():
+        SlowBulk.read = asyncio.Event()
+        SlowBulk.finished = asyncio.Event()
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(application, log_level="warning"))
+        serving = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+        try:
+            # aiohttp asks for gzip by default.
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"http://127.0.0.1:{sock.getsockname()[1]}/trello/bulk/move_card",
+                                        json=REQUEST, headers={"Authorization": f"Bearer {token}"}) as response:
+                    first = await response.content.readline()
+                    arrived_before_last_item = not SlowBulk.finished.is_set()
+                    SlowBulk.read.set()
+                    rest = await response.content.read()
+                    return response, first, arrived_before_last_item, rest
+        finally:
+            server.should_exit = True
+            await serving
+
+    response, first, arrived_before_last_item, rest = asyncio.run(main())
+    assert response.status == 200
+    assert response.headers["Content-Encoding"] == "identity"
+    assert arrived_before_last_item
+    assert first == b'{"index": 0, "status": 200, "response": {"id": "card-0"}}\n'
+    assert rest == b'{"index": 1, "status": 200, "response": {"id": "card-1"}}\n'
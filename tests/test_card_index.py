@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.services.trello.trello_cache import trello_cache
+from app.services.trello.trello_client import TrelloClient
+
+CARDS = [{"id": f"id-{n}", "name": f"Card {n}", "idList": "list"} for n in range(1000)]
+
+
+class StubTrelloClient(TrelloClient):
+    """
+    Serves the card list from memory and counts the reads.
+    """
+
+    def __init__(self, token: str, cards=None):
+        super().__init__("key", token)
+        self.cards = cards or CARDS
+        self.reads = 0
+
+    async def _stream(self, path, params=None):
+        self.reads += 1
+        for card in self.cards:
+            await asyncio.sleep(0)
+            yield card
+
+
+def test_lookup_stops_at_the_card():
+    client = StubTrelloClient("stops-at-card")
+    assert asyncio.run(client._get_card_id("list", "Card 10")) == ("id-10", False)
+    assert asyncio.run(client._get_card_id("list", "Card 5")) == ("id-5", True)
+    assert client.reads == 1
+
+
+def test_concurrent_lookups_of_different_cards_share_reads():
+    client = StubTrelloClient("concurrent")
+
+    async def main():
+        return await asyncio.gather(*[client._get_card_id("list", f"Card {n}") for n in range(0, 1000, 20)])
+
+    results = asyncio.run(main())
+    assert [card_id for card_id, _ in results] == [f"id-{n}" for n in range(0, 1000, 20)]
+    # One read that stops at the first card and one read of the whole list for the others.
+    assert client.reads == 2
+
+
+def test_missing_card():
+    client = StubTrelloClient("missing")
+    with pytest.raises(ValueError):
+        asyncio.run(client._get_card_id("list", "Card 1000"))
+
+
+DUPLICATES = [{"id": "first", "name": "Same", "idList": "list"},
+              {"id": "other", "name": "Other", "idList": "list"},
+              {"id": "second", "name": "Same", "idList": "list"}]
+
+
+def test_duplicate_names_resolve_to_the_first_card():
+    # Early stopping read.
+    client = StubTrelloClient("duplicates-lookup", DUPLICATES)
+    assert asyncio.run(client._get_card_id("list", "Same")) == ("first", False)
+
+    # Whole list read, then a lookup from the index.
+    client = StubTrelloClient("duplicates-index", DUPLICATES)
+    assert asyncio.run(client.index_cards("list"))["Same"] == "first"
+    assert asyncio.run(client._get_card_id("list", "Same")) == ("first", True)
+
+
+def test_partial_read_merged_into_index_keeps_the_first_card():
+    client = StubTrelloClient("duplicates-merge", DUPLICATES)
+    trello_cache.set_cards(client.credentials, "list", [DUPLICATES[2]])
+    trello_cache.set_cards(client.credentials, "list", DUPLICATES[:1], complete=False)
+    assert trello_cache.get_card_id(client.credentials, "list", "Same") == "first"
+
+
+def test_added_card_does_not_replace_indexed_card_of_the_same_name():
+    client = StubTrelloClient("duplicates-add", DUPLICATES)
+    asyncio.run(client.index_cards("list"))
+    trello_cache.add_card(client.credentials, "list", "Same", "new")
+    trello_cache.add_card_for_all("list", "Same", "new")
+    assert trello_cache.get_card_id(client.credentials, "list", "Same") == "first"
+
+
+class TruncatedResponse:
+
+    class content:
+
+        @staticmethod
+        async def iter_chunked(chunk_size):
+            yield b'[{"id": "id-0", "name": "Card 0", "idList": "list"},'
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_truncated_list_is_a_connection_error(monkeypatch):
+    client = TrelloClient("key", "truncated")
+
+    async def _open(*args, **kwargs):
+        return TruncatedResponse()
+
+    monkeypatch.setattr(client, "_open", _open)
+    with pytest.raises(ConnectionError, match="Could not read Trello response"):
+        asyncio.run(client._get_card_id("list", "Card 1"))
@@ -0,0 +1,106 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.services.trello import trello_client
+from app.services.trello.circuit_breaker import Circuit, CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.services.trello.errors import CircuitOpenError
+from app.services.trello.trello_client import TrelloClient
+
+
+def open_circuit(reset_timeout: float = 0.) -> Circuit:
+    circuit = Circuit("api.trello.com", threshold=2, reset_timeout=reset_timeout, transitions=Counter())
+    circuit.failure()
+    circuit.failure()
+    return circuit
+
+
+def test_opens_after_threshold_failures():
+    circuit = open_circuit(reset_timeout=60)
+    assert circuit.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before()
+    assert circuit.rejected == 1
+
+
+def test_half_open_lets_one_probe_through():
+    circuit = open_circuit()
+    assert circuit.before() is True
+    assert circuit.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.before()
+    circuit.success()
+    assert circuit.state == CLOSED
+    assert circuit.before() is False
+
+
+def test_failed_probe_opens_again():
+    circuit = open_circuit()
+    circuit.before()
+    circuit.failure()
+    assert circuit.state == OPEN
+
+
+def test_released_probe_lets_next_request_probe():
+    circuit = open_circuit()
+    circuit.before()
+    circuit.release()
+    assert circuit.state == HALF_OPEN
+    assert circuit.before() is True
+
+
+class StubSession:
+
+    def __init__(self, request):
+        self.request = request
+
+
+class StubPool:
+
+    def __init__(self, request):
+        self.session = StubSession(request)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.)
+    monkeypatch.setattr(trello_client, "trello_circuit_breaker", breaker)
+    return breaker
+
+
+def test_cancelled_probe_is_released(monkeypatch, breaker):
+    async def hang(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(trello_client, "trello_session_pool", StubPool(hang))
+    client = TrelloClient("key", "token")
+    circuit = breaker.circuit(trello_client.TRELLO_HOST, client.credentials)
+    circuit.failure()
+
+    async def main():
+        probe = asyncio.ensure_future(client._open("GET", "/members/me/boards"))
+        await asyncio.sleep(0.01)
+        assert circuit.probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(main())
+    assert not circuit.probing
+    assert circuit.before() is True
+
+
+def test_probe_failing_with_unexpected_error_is_released(monkeypatch, breaker):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(trello_client, "trello_session_pool", StubPool(fail))
+    client = TrelloClient("key", "token")
+    circuit = breaker.circuit(trello_client.TRELLO_HOST, client.credentials)
+    circuit.failure()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(client._open("GET", "/members/me/boards"))
+    assert not circuit.probing
+    assert circuit.before() is True
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils.json_stream import iter_json_array
+
+
+class ChunkedStream:
+    """
+    Stands in for aiohttp StreamReader and returns the body in the given chunks.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def iter_chunked(self, chunk_size):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def split(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def read(chunks):
+    async def _read():
+        return [item async for item in iter_json_array(ChunkedStream(chunks))]
+    return asyncio.run(_read())
+
+
+CARDS = [{"id": str(n), "name": f"Card {n}", "idList": "list", "labels": [1, {"a": "]"}]} for n in range(20)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_items_split_across_chunks(size):
+    body = json.dumps(CARDS, indent=1).encode()
+    assert read(split(body, size)) == CARDS
+
+
+def test_multibyte_characters_split_across_chunks():
+    cards = [{"name": "Zażółć gęślą jaźń"}, {"name": "カード 🃏"}]
+    body = json.dumps(cards, ensure_ascii=False).encode()
+    # One byte chunks split every multibyte character.
+    assert read(split(body, 1)) == cards
+
+
+def test_empty_array():
+    assert read([b" [ ", b"\n]"]) == []
+
+
+def test_truncated_array():
+    body = json.dumps(CARDS).encode()
+    with pytest.raises(ValueError, match="Unexpected end"):
+        read(split(body[:len(body) // 2], 16))
+
+
+def test_not_an_array():
+    with pytest.raises(ValueError, match="Expected JSON array"):
+        read([b'{"id": "1"}'])
+
+
+@pytest.mark.parametrize("body", [b'[{"id": "1"}', b'[{"id": "1"},', b"[", b""])
+def test_array_cut_between_items(body):
+    with pytest.raises(ValueError, match="Unexpected end"):
+        read([body])
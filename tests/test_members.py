@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.services.trello.errors import TrelloResponseError
+from app.services.trello.trello_client import TrelloClient
+from load_test.fake_trello import FakeTrello
+
+
+class FakeTrelloClient(TrelloClient):
+    """
+    Sends GETs to the fake Trello without HTTP.
+    """
+
+    def __init__(self, fake: FakeTrello, token: str):
+        super().__init__("key", token)
+        self.fake = fake
+        self.paths = []
+
+    async def _fetch(self, path, params=None):
+        self.paths.append(path)
+        status, body = self.fake.dispatch("GET", path, dict(params or {}), {})
+        if status != 200:
+            raise TrelloResponseError(status, str(body))
+        return body
+
+
+@pytest.fixture
+def fake():
+    fake = FakeTrello()
+    board = fake.add_board("Board")
+    for username in ["ann", "anna", "annabel", "bob"]:
+        fake.add_member(board["id"], username)
+    other = fake.add_board("Other")
+    fake.add_member(other["id"], "carl")
+    return fake
+
+
+def member_id(fake: FakeTrello, username: str) -> str:
+    return next(member["id"] for member in fake.members.values() if member["username"] == username)
+
+
+def board_url(fake: FakeTrello) -> str:
+    return next(board["url"] for board in fake.boards.values() if board["name"] == "Board")
+
+
+def test_member_by_id_username_and_email(fake):
+    client = FakeTrelloClient(fake, "by-all")
+    url = board_url(fake)
+    assert asyncio.run(client.get_member_id(url, member_id(fake, "bob"))) == member_id(fake, "bob")
+    assert asyncio.run(client.get_member_id(url, "@Bob")) == member_id(fake, "bob")
+    assert asyncio.run(client.get_member_id(url, " Bob@Example.com ")) == member_id(fake, "bob")
+
+
+def test_email_takes_only_the_exact_match(fake):
+    client = FakeTrelloClient(fake, "exact")
+    # Search for ann@example.com finds anna and annabel too.
+    status, found = fake.dispatch("GET", "/search/members", {"query": "ann@example.com", "limit": "20"}, {})
+    assert len(found) == 3
+    assert asyncio.run(client.get_member_id(board_url(fake), "ann@example.com")) == member_id(fake, "ann")
+
+
+def test_email_without_exact_match_is_not_found_and_cached(fake):
+    client = FakeTrelloClient(fake, "not-found")
+    url = board_url(fake)
+    # Fuzzy search finds ann, anna and annabel, none has this email.
+    with pytest.raises(ValueError, match="does not exist"):
+        asyncio.run(client.get_member_id(url, "an@example.com"))
+    with pytest.raises(ValueError, match="does not exist"):
+        asyncio.run(client.get_member_id(url, "an@example.com"))
+    assert client.paths.count("/search/members") == 1
+
+
+def test_email_of_member_of_other_board_is_not_found(fake):
+    client = FakeTrelloClient(fake, "other-board")
+    with pytest.raises(ValueError):
+        asyncio.run(client.get_member_id(board_url(fake), "carl@example.com"))
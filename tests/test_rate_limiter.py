@@ -0,0 +1,52 @@
+import asyncio
+from time import monotonic
+
+import pytest
+
+from app.services.trello import trello_client
+from app.services.trello.errors import TrelloResponseError
+from app.services.trello.rate_limiter import TrelloRateLimiter
+from app.services.trello.trello_client import TrelloClient
+
+
+class ThrottledResponse:
+    status = 429
+    headers = {"Retry-After": "0.2"}
+
+    async def text(self):
+        return '{"error": "API_TOKEN_LIMIT_EXCEEDED"}'
+
+    def release(self):
+        pass
+
+
+class ThrottledSession:
+
+    def __init__(self):
+        self.sent = []
+
+    async def request(self, *args, **kwargs):
+        self.sent.append(monotonic())
+        return ThrottledResponse()
+
+
+class StubPool:
+
+    def __init__(self):
+        self.session = ThrottledSession()
+
+
+@pytest.mark.parametrize("rate", [0, 100])
+def test_retry_after_is_respected(monkeypatch, rate):
+    pool = StubPool()
+    monkeypatch.setattr(trello_client, "trello_session_pool", pool)
+    monkeypatch.setattr(trello_client, "trello_rate_limiter",
+                        TrelloRateLimiter(rate=rate, burst=20, max_throttled_retries=2))
+
+    with pytest.raises(TrelloResponseError) as error:
+        asyncio.run(TrelloClient("key", f"throttled-{rate}")._open("GET", "/members/me/boards"))
+
+    assert error.value.status == 429
+    # The first request and two throttled retries, each sent after Retry-After.
+    assert len(pool.session.sent) == 3
+    assert all(later - earlier >= 0.19 for earlier, later in zip(pool.session.sent, pool.session.sent[1:]))
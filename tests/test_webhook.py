@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import config
+from app.api import trello_endpoint
+from app.services.trello.trello_cache import trello_cache, credentials_key
+from app.services.trello.webhook import signature
+from app.utils.ttl_cache import MISSING
+from load_test.fake_trello import FakeTrello, trello_id
+
+SECRET = "webhook-secret"
+CALLBACK_URL = "https://microservice.example.com/trello/webhook"
+CREDENTIALS = credentials_key("key", "webhook-token")
+
+
+class RecordingTrello(FakeTrello):
+    """
+    Fake Trello that keeps the webhook actions instead of sending them.
+    """
+
+    def __init__(self):
+        super().__init__(webhook_secret=SECRET)
+        self.actions = []
+
+    async def _notify(self, webhook: dict, action: dict) -> None:
+        self.actions.append(action)
+
+    def change(self, method: str, path: str, data: dict = None) -> dict:
+        async def _change():
+            status, body = self.dispatch(method, path, {}, data or {})
+            assert status == 200, body
+            await asyncio.gather(*self._notifications)
+        asyncio.run(_change())
+        return self.actions.pop()
+
+
+@pytest.fixture
+def trello():
+    fake = RecordingTrello()
+    board = fake.seed(boards=1, lists=2, cards=4, members=0)[0]
+    webhook_id = trello_id()
+    fake.webhooks[webhook_id] = {"id": webhook_id, "idModel": board["id"], "callbackURL": CALLBACK_URL,
+                                 "active": True, "token": "webhook-token"}
+    # Both lists are indexed, as after a lookup.
+    for list_id in board["idLists"]:
+        trello_cache.set_cards(CREDENTIALS, list_id, list(fake.lists[list_id]["cards"].values()))
+    return fake
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config.microservice, "trello_webhook_secret", SECRET)
+    monkeypatch.setattr(config.microservice, "trello_webhook_callback_url", CALLBACK_URL)
+    application = FastAPI()
+    application.include_router(trello_endpoint.router)
+    return TestClient(application)
+
+
+def post(client: TestClient, action: dict, secret: str = SECRET):
+    body = json.dumps({"action": action, "model": {"id": action["data"]["board"]["id"]}}).encode()
+    return client.post("/trello/webhook", content=body, headers={
+        "Content-Type": "application/json",
+        "X-Trello-Webhook": signature(body, CALLBACK_URL, secret)
+    })
+
+
+def lists(trello: RecordingTrello):
+    return list(trello.lists)
+
+
+def card_id(list_id: str, name: str):
+    return trello_cache.get_card_id(CREDENTIALS, list_id, name)
+
+
+def test_head_check(client):
+    assert client.head("/trello/webhook").status_code == 200
+
+
+def test_invalid_signature_is_rejected(client, trello):
+    first, _ = lists(trello)
+    action = trello.change("POST", "/cards", {"idList": first, "name": "Forged"})
+
+    assert post(client, action, secret="other-secret").status_code == 401
+    assert client.post("/trello/webhook", json={"action": action}).status_code == 401
+    assert card_id(first, "Forged") is MISSING
+
+
+def test_invalid_body(client):
+    body = b"not json"
+    response = client.post("/trello/webhook", content=body,
+                           headers={"X-Trello-Webhook": signature(body, CALLBACK_URL, SECRET)})
+    assert response.status_code == 422
+
+
+def test_created_card_is_indexed(client, trello):
+    first, _ = lists(trello)
+    action = trello.change("POST", "/cards", {"idList": first, "name": "New card"})
+
+    response = post(client, action)
+    assert response.status_code == 200
+    assert response.json() == {"applied": True}
+    assert card_id(first, "New card") == action["data"]["card"]["id"]
+
+
+def test_renamed_card(client, trello):
+    first, _ = lists(trello)
+    card = next(iter(trello.lists[first]["cards"].values()))
+    old_name = card["name"]
+    action = trello.change("PUT", f"/cards/{card['id']}", {"name": "Renamed"})
+
+    assert post(client, action).json() == {"applied": True}
+    assert card_id(first, old_name) is MISSING
+    assert card_id(first, "Renamed") == card["id"]
+
+
+def test_moved_card(client, trello):
+    first, second = lists(trello)
+    card = next(iter(trello.lists[first]["cards"].values()))
+    action = trello.change("PUT", f"/cards/{card['id']}", {"idList": second})
+
+    assert post(client, action).json() == {"applied": True}
+    assert card_id(first, card["name"]) is MISSING
+    assert card_id(second, card["name"]) == card["id"]
+
+
+def test_archived_card(client, trello):
+    first, _ = lists(trello)
+    card = next(iter(trello.lists[first]["cards"].values()))
+    action = trello.change("PUT", f"/cards/{card['id']}", {"closed": "true"})
+
+    assert post(client, action).json() == {"applied": True}
+    assert card_id(first, card["name"]) is MISSING
+
+
+def test_deleted_card(client, trello):
+    first, _ = lists(trello)
+    card = next(iter(trello.lists[first]["cards"].values()))
+    action = trello.change("DELETE", f"/cards/{card['id']}")
+
+    assert post(client, action).json() == {"applied": True}
+    assert card_id(first, card["name"]) is MISSING
+
+
+def test_other_card_change_is_not_applied(client, trello):
+    first, _ = lists(trello)
+    card = next(iter(trello.lists[first]["cards"].values()))
+    action = {"type": "updateCard", "data": {"card": {"id": card["id"], "desc": "New description"},
+                                             "old": {"desc": ""}, "board": {"id": card["idBoard"]}}}
+
+    assert post(client, action).json() == {"applied": False}
+    assert card_id(first, card["name"]) == card["id"]